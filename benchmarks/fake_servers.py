@@ -0,0 +1,265 @@
+"""Локальные заменители API Практикума и Telegram Bot API для бенчмарков.
+
+Запуск из корня репозитория:
+python benchmarks/fake_servers.py [--api-latency 0.05] [--error-rate 0.01] ...
+Адреса серверов печатаются первой строкой в stdout в виде JSON.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+NAME = re.compile(r'работы "([^"]+)"')
+
+
+class Stats:
+    """Счётчики обоих серверов и задержки доставки уведомлений.
+    served: название работы -> [статус, время первой выдачи, доставлено].
+    """
+
+    def __init__(self):
+        """Создаёт пустые счётчики."""
+        self.lock = threading.Lock()
+        self.polls = 0
+        self.api_errors = 0
+        self.messages = 0
+        self.telegram_errors = 0
+        self.served = {}
+        self.latencies = []
+
+    def report(self):
+        """Возвращает снимок счётчиков."""
+        with self.lock:
+            return {
+                'polls': self.polls,
+                'api_errors': self.api_errors,
+                'messages': self.messages,
+                'telegram_errors': self.telegram_errors,
+                'latencies': list(self.latencies),
+            }
+
+
+class Tenant:
+    """Работы одного токена на стороне фейкового API."""
+
+    def __init__(self, token, homeworks, comment_size):
+        """Создаёт homeworks работ, все в статусе reviewing.
+        comment_size задаёт длину reviewer_comment и так размер ответа.
+        """
+        self.lock = threading.Lock()
+        self.homeworks = [
+            {
+                'id': number,
+                'homework_name': f'{token}__hw{number}.zip',
+                'status': STATUSES[0],
+                'reviewer_comment': 'x' * comment_size,
+                'date_updated': '2020-02-13T14:40:57Z',
+                'lesson_name': 'Бенчмарк',
+                'updated': int(time.time()),
+            }
+            for number in range(homeworks)
+        ]
+
+    def step(self, change_rate):
+        """С вероятностью change_rate меняет статус случайной работы."""
+        if random.random() >= change_rate:
+            return
+        with self.lock:
+            homework = random.choice(self.homeworks)
+            position = STATUSES.index(homework['status'])
+            homework['status'] = STATUSES[(position + 1) % len(STATUSES)]
+            homework['updated'] = int(time.time())
+            homework['date_updated'] = time.strftime(
+                '%Y-%m-%dT%H:%M:%SZ', time.gmtime(homework['updated']))
+
+    def answer(self, from_date):
+        """Возвращает работы, изменённые не раньше from_date."""
+        with self.lock:
+            return [
+                {key: value for key, value in homework.items()
+                 if key != 'updated'}
+                for homework in self.homeworks
+                if homework['updated'] >= from_date
+            ]
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Общая часть обработчиков: задержка, ошибки, ответ JSON."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def reply(self, status, data, headers=None):
+        """Отправляет ответ data в JSON с кодом status."""
+        body = json.dumps(data, ensure_ascii=False).encode('UTF-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def delay(self, latency):
+        """Имитирует сетевую задержку сервиса с разбросом ±50%."""
+        if latency:
+            time.sleep(latency * random.uniform(0.5, 1.5))
+
+    def log_message(self, format, *args):
+        """Не пишет запросы в stderr."""
+        pass
+
+
+class PracticumHandler(FakeHandler):
+    """Эндпоинт homework_statuses с токенами вида OAuth <token>."""
+
+    def do_GET(self):
+        """Отвечает статусами работ токена или внедрённой ошибкой."""
+        server = self.server
+        if self.path == '/stats':
+            self.reply(200, server.stats.report())
+            return
+        self.delay(server.options.api_latency)
+        token = self.headers.get('Authorization', '').split(' ')[-1]
+        query = parse_qs(urlsplit(self.path).query)
+        from_date = int(query.get('from_date', ['0'])[0])
+        with server.stats.lock:
+            server.stats.polls += 1
+            if random.random() < server.options.error_rate:
+                server.stats.api_errors += 1
+                failed = True
+            else:
+                failed = False
+            tenant = server.tenants.get(token)
+            if tenant is None:
+                tenant = server.tenants[token] = Tenant(
+                    token, server.options.homeworks,
+                    server.options.comment_size)
+        if failed:
+            self.reply(503, {'error': 'injected'}, {'Retry-After': '1'})
+            return
+        tenant.step(server.options.change_rate)
+        homeworks = tenant.answer(from_date)
+        now = time.monotonic()
+        with server.stats.lock:
+            for homework in homeworks:
+                name, status = homework['homework_name'], homework['status']
+                served = server.stats.served.get(name)
+                if served is None or served[0] != status:
+                    server.stats.served[name] = [status, now, False]
+        self.reply(200, {
+            'homeworks': homeworks,
+            'current_date': int(time.time()),
+        })
+
+
+class TelegramHandler(FakeHandler):
+    """Метод sendMessage по адресу /bot<token>/sendMessage."""
+
+    def do_GET(self):
+        """Отдаёт счётчики по адресу /stats."""
+        if self.path != '/stats':
+            self.send_error(404)
+            return
+        self.reply(200, self.server.stats.report())
+
+    def do_POST(self):
+        """Принимает сообщение и считает задержку от первой выдачи статуса."""
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length) or b'{}')
+        self.delay(server.options.telegram_latency)
+        if not self.path.endswith('/sendMessage'):
+            self.reply(200, {'ok': True, 'result': True})
+            return
+        if random.random() < server.options.telegram_error_rate:
+            with server.stats.lock:
+                server.stats.telegram_errors += 1
+            self.reply(429, {
+                'ok': False, 'error_code': 429,
+                'description': 'Too Many Requests: retry after 1',
+                'parameters': {'retry_after': 1},
+            })
+            return
+        text = data.get('text', '')
+        now = time.monotonic()
+        with server.stats.lock:
+            server.stats.messages += 1
+            for name in NAME.findall(text):
+                served = server.stats.served.get(name)
+                if served is not None and not served[2]:
+                    served[2] = True
+                    server.stats.latencies.append(now - served[1])
+        self.reply(200, {'ok': True, 'result': {
+            'message_id': server.stats.messages,
+            'date': int(time.time()),
+            'chat': {'id': int(data.get('chat_id', 0)), 'type': 'private'},
+            'text': text,
+        }})
+
+
+def start(options, host='127.0.0.1'):
+    """Запускает оба сервера в фоновых потоках.
+    Возвращает (сервер Практикума, сервер Telegram) с общими счётчиками.
+    """
+    stats = Stats()
+    servers = []
+    for handler, port in ((PracticumHandler, options.api_port),
+                          (TelegramHandler, options.telegram_port)):
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        server.options = options
+        server.stats = stats
+        server.tenants = {}
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return tuple(servers)
+
+
+def make_parser():
+    """Возвращает разборщик параметров серверов."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--api-port', type=int, default=0)
+    parser.add_argument('--telegram-port', type=int, default=0)
+    parser.add_argument('--api-latency', type=float, default=0.05,
+                        help='средняя задержка ответа API, с')
+    parser.add_argument('--telegram-latency', type=float, default=0.03,
+                        help='средняя задержка Telegram, с')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='доля ответов API с кодом 503')
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0,
+                        help='доля ответов Telegram с кодом 429')
+    parser.add_argument('--homeworks', type=int, default=5,
+                        help='работ на токен')
+    parser.add_argument('--comment-size', type=int, default=100,
+                        help='длина комментария ревьюера, байт')
+    parser.add_argument('--change-rate', type=float, default=0.2,
+                        help='вероятность смены статуса за запрос')
+    return parser
+
+
+def main(argv):
+    """Запускает серверы и работает до прерывания."""
+    options = make_parser().parse_args(argv)
+    practicum, telegram = start(options)
+    print(json.dumps({
+        'api': 'http://127.0.0.1:{}/api/user_api/homework_statuses/'.format(
+            practicum.server_address[1]),
+        'telegram': 'http://127.0.0.1:{}'.format(
+            telegram.server_address[1]),
+    }), flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,70 @@
+"""Замер памяти на одну подписку при 10 000 и 100 000 подписок.
+
+Запуск из корня репозитория: python benchmarks/memory.py [N ...]
+"""
+import gc
+import json
+import sys
+import tracemalloc
+from os.path import abspath, dirname
+
+root_dir = dirname(dirname(abspath(__file__)))
+sys.path.append(root_dir)
+
+import homework  # noqa: E402
+from subscriptions import Subscription  # noqa: E402
+
+HOMEWORKS = 5
+ANSWER = json.dumps({
+    'homeworks': [
+        {
+            'id': number,
+            'status': status,
+            'homework_name': f'username__hw{number}_project.zip',
+            'reviewer_comment': 'Всё нравится',
+            'date_updated': '2020-02-13T14:40:57Z',
+            'lesson_name': 'Итоговый проект',
+        }
+        for number, status in zip(
+            range(HOMEWORKS), ['approved', 'rejected', 'reviewing'] * 2)
+    ],
+    'current_date': 1581604970,
+})
+
+
+def make_subscription(number):
+    """Создаёт подписку в состоянии после доставки всех уведомлений."""
+    subscription = Subscription(f'y0_token_{number:012d}', 100000 + number)
+    response = json.loads(ANSWER)
+    changes, _ = homework.collect_changes(subscription, response)
+    subscription.expect(changes, response['current_date'])
+    for key, _, _ in changes:
+        subscription.confirm(key)
+    return subscription
+
+
+def measure(count):
+    """Возвращает байты на подписку для count подписок."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    subscriptions = [make_subscription(number) for number in range(count)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(subscriptions) == count
+    return (after - before) / count
+
+
+def main(counts):
+    """Печатает таблицу потребления памяти."""
+    homework.logger.disabled = True
+    print(f'{"подписок":>10} {"байт/подписку":>15} {"всего, МБ":>10}')
+    for count in counts:
+        per_subscription = measure(count)
+        total = per_subscription * count / 2 ** 20
+        print(f'{count:>10} {per_subscription:>15.0f} {total:>10.1f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,165 @@
+"""Пропускная способность цикла опроса на N подписках.
+
+Бот опрашивает локальные заменители API Практикума и Telegram
+(benchmarks/fake_servers.py, запускаются отдельным процессом, чтобы не
+влиять на RSS бота). Печатает опросов в секунду, p50/p99 задержки от первой
+выдачи нового статуса API до получения уведомления Telegram и память бота.
+
+Запуск из корня репозитория:
+python benchmarks/throughput.py [--tenants 100] [--duration 30] [--mode async]
+Остальные параметры передаются серверам, например --api-latency 0.1.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from os.path import abspath, dirname, join
+
+root_dir = dirname(dirname(abspath(__file__)))
+sys.path.append(root_dir)
+
+import telegram  # noqa: E402
+
+import homework  # noqa: E402
+from breaker import CircuitBreaker  # noqa: E402
+from delivery import (  # noqa: E402
+    DeliveryQueue, RateLimiter, is_telegram_outage)
+from lifecycle import Lifecycle  # noqa: E402
+from practicum import PracticumClient  # noqa: E402
+from scheduler import PollScheduler  # noqa: E402
+from storage import StateStore  # noqa: E402
+from subscriptions import Subscription  # noqa: E402
+
+
+def make_parser():
+    """Возвращает разборщик параметров бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=30,
+                        help='длительность замера, с')
+    parser.add_argument('--interval', type=float, default=1,
+                        help='интервал опроса одной подписки, с')
+    parser.add_argument('--mode', choices=('sync', 'async', 'threads'),
+                        default='sync')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--telegram-rate', type=float, default=1000,
+                        help='лимит сообщений в секунду')
+    parser.add_argument('--log-file', help='писать лог бота в файл')
+    parser.add_argument('--streaming', action='store_true',
+                        help='разбирать ответы API потоком')
+    return parser
+
+
+def start_servers(server_args):
+    """Запускает процесс с фейковыми серверами и возвращает (процесс, URL)."""
+    process = subprocess.Popen(
+        [sys.executable, join(root_dir, 'benchmarks', 'fake_servers.py'),
+         *server_args],
+        stdout=subprocess.PIPE, text=True,
+    )
+    return process, json.loads(process.stdout.readline())
+
+
+def fetch_stats(url):
+    """Читает счётчики фейковых серверов."""
+    with urllib.request.urlopen(f'{url}/stats') as response:
+        return json.load(response)
+
+
+def memory():
+    """Возвращает (текущий RSS, пиковый RSS) процесса в МБ."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    current = peak
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    current = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return current, peak
+
+
+def percentile(values, share):
+    """Возвращает перцентиль share отсортированного списка values."""
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def configure(urls, options):
+    """Направляет бота на фейковые серверы и возвращает очередь доставки."""
+    homework.ENDPOINT = urls['api']
+    homework.CONCURRENCY = options.concurrency
+    homework.STREAMING = options.streaming
+    homework.POOL_QUEUE = options.concurrency * 2
+    homework.api_client = PracticumClient(pool_size=options.concurrency)
+    homework.scheduler = PollScheduler(
+        options.interval, options.interval,
+        options.interval, options.interval * 8)
+    bot = telegram.Bot(
+        token='123456:bench', base_url=f'{urls["telegram"]}/bot')
+    return DeliveryQueue(
+        bot, RateLimiter(options.telegram_rate, 0), homework.SEND_ATTEMPTS,
+        CircuitBreaker('telegram', is_failure=is_telegram_outage),
+    )
+
+
+def run(queue, subscriptions, options):
+    """Крутит цикл опроса options.duration секунд."""
+    stop = Lifecycle()
+    timer = threading.Timer(options.duration, stop.set)
+    timer.daemon = True
+    timer.start()
+    if options.mode == 'async':
+        asyncio.run(homework.async_main(
+            queue, subscriptions, StateStore(), stop))
+    elif options.mode == 'threads':
+        homework.run_threaded(queue, subscriptions, StateStore(), stop)
+    else:
+        homework.run_polling(queue, subscriptions, StateStore(), stop)
+
+
+def main(argv):
+    """Запускает замер и печатает результаты."""
+    options, server_args = make_parser().parse_known_args(argv)
+    logging.basicConfig(
+        filename=options.log_file or os.devnull,
+        level=logging.INFO if options.log_file else logging.WARNING,
+    )
+    process, urls = start_servers(server_args)
+    try:
+        queue = configure(urls, options)
+        subscriptions = [
+            Subscription(f'token{number:06d}', 100000 + number)
+            for number in range(options.tenants)
+        ]
+        start = time.monotonic()
+        run(queue, subscriptions, options)
+        elapsed = time.monotonic() - start
+        stats = fetch_stats(urls['telegram'])
+    finally:
+        process.terminate()
+        process.wait()
+    latencies = sorted(stats['latencies'])
+    current, peak = memory()
+    print(f'режим: {options.mode}, подписок: {options.tenants}, '
+          f'длительность: {elapsed:.1f} с')
+    print(f'опросов/с: {stats["polls"] / elapsed:.1f} '
+          f'(ошибок API: {stats["api_errors"]})')
+    print(f'уведомлений: {len(latencies)}, сообщений: {stats["messages"]} '
+          f'(ошибок Telegram: {stats["telegram_errors"]})')
+    print(f'задержка уведомления p50: {percentile(latencies, 0.5):.3f} с, '
+          f'p99: {percentile(latencies, 0.99):.3f} с')
+    print(f'RSS: {current:.1f} МБ, пик: {peak:.1f} МБ')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+
+import exceptions
+import metrics
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Предохранитель вокруг вызовов внешнего сервиса.
+    После failure_threshold сбоев подряд размыкается и сразу отклоняет
+    вызовы; через recovery_time пропускает один пробный вызов.
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_time=60,
+                 is_failure=None):
+        """Создаёт замкнутый предохранитель name.
+        is_failure решает, считать ли исключение сбоем сервиса.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.is_failure = is_failure or (lambda error: True)
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.probing = False
+        metrics.CIRCUIT_STATE.set(STATE_VALUES[CLOSED], name=name)
+
+    def set_state(self, state):
+        """Переключает состояние, логирует и публикует его в метриках."""
+        if state == self.state:
+            return
+        logger.warning(
+            f'Предохранитель {self.name}: {self.state} -> {state}')
+        self.state = state
+        metrics.CIRCUIT_STATE.set(STATE_VALUES[state], name=self.name)
+
+    def before_call(self):
+        """Разрешает вызов или выбрасывает CircuitOpenError."""
+        with self.lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.recovery_time - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self.set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return
+            raise exceptions.CircuitOpenError(
+                f'Сервис {self.name} недоступен, вызов пропущен',
+                retry_after=max(remaining, 1),
+            )
+
+    def record_success(self):
+        """Замыкает предохранитель после успешного вызова."""
+        with self.lock:
+            self.failures = 0
+            self.probing = False
+            self.set_state(CLOSED)
+
+    def record_failure(self):
+        """Учитывает сбой и при необходимости размыкает предохранитель."""
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if (self.state == HALF_OPEN
+                    or self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.set_state(OPEN)
+
+    def record(self, error=None):
+        """Учитывает итог вызова: ошибку error или успех при None."""
+        if error is not None and self.is_failure(error):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def call(self, func, *args, **kwargs):
+        """Вызывает func под защитой предохранителя."""
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as error:
+            self.record(error)
+            raise
+        self.record_success()
+        return result
@@ -0,0 +1,106 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATUS_NAMES = {
+    'approved': 'принята',
+    'reviewing': 'на проверке',
+    'rejected': 'возвращена с замечаниями',
+}
+
+
+def describe(subscription, key, status):
+    """Описывает статус работы key одной строкой."""
+    name = subscription.names.get(key, key)
+    return f'"{name}": {STATUS_NAMES.get(status, status)}'
+
+
+class CommandInterface:
+    """Отвечает на команды чатов по статусам, известным боту.
+    Ответы берутся из состояния подписок в памяти, без запросов к API.
+    """
+
+    def __init__(self, subscriptions):
+        """Запоминает список подписок.
+        Список не копируется: перезагрузка настроек меняет его на месте,
+        и команды видят новые и удалённые подписки сразу.
+        """
+        self.subscriptions = subscriptions
+        self.updater = None
+
+    def find(self, update):
+        """Возвращает подписки чата, из которого пришла команда."""
+        chat_id = str(update.effective_chat.id)
+        return [
+            subscription for subscription in list(self.subscriptions)
+            if str(subscription.chat_id) == chat_id
+        ]
+
+    def status(self, update, context):
+        """Команда /status: последние известные статусы работ."""
+        lines = []
+        for subscription in self.find(update):
+            for key, status in list(subscription.statuses.items()):
+                lines.append(describe(subscription, key, status))
+        update.effective_message.reply_text(
+            '\n'.join(lines) or 'Статусы работ пока неизвестны')
+
+    def history(self, update, context):
+        """Команда /history: последние отправленные уведомления."""
+        lines = []
+        for subscription in self.find(update):
+            for key, status in list(subscription.history or ()):
+                lines.append(describe(subscription, key, status))
+        update.effective_message.reply_text(
+            '\n'.join(lines) or 'История уведомлений пуста')
+
+    def pause(self, update, context):
+        """Команда /pause: приостанавливает опрос для чата."""
+        self.set_paused(update, True, 'Уведомления приостановлены')
+
+    def resume(self, update, context):
+        """Команда /resume: возобновляет опрос для чата."""
+        self.set_paused(update, False, 'Уведомления возобновлены')
+
+    def set_paused(self, update, paused, answer):
+        """Меняет признак паузы у подписок чата и отвечает в чат."""
+        subscriptions = self.find(update)
+        for subscription in subscriptions:
+            subscription.paused = paused
+        if not subscriptions:
+            answer = 'Чат не подписан на статусы работ'
+        update.effective_message.reply_text(answer)
+
+    def start(self, token, webhook_url=None, port=8443):
+        """Запускает обработку команд в фоновых потоках Updater.
+        С webhook_url команды принимаются через вебхук, иначе - long polling.
+        """
+        from telegram.ext import CommandHandler, Updater
+
+        updater = Updater(token=token, use_context=True)
+        for name in ('status', 'history', 'pause', 'resume'):
+            updater.dispatcher.add_handler(
+                CommandHandler(name, getattr(self, name)))
+        if webhook_url:
+            updater.start_webhook(
+                listen='0.0.0.0', port=port, url_path=token,
+                webhook_url=f'{webhook_url.rstrip("/")}/{token}',
+            )
+        else:
+            updater.start_polling()
+        logger.info('Запущена обработка команд бота')
+        self.updater = updater
+        return updater
+
+    def stop(self):
+        """Останавливает обработку команд, если она запущена."""
+        if self.updater is not None:
+            self.updater.stop()
+            self.updater = None
+
+    def restart(self, token, webhook_url=None, port=8443):
+        """Перезапускает обработку команд с новым токеном бота."""
+        if self.updater is None:
+            return None
+        self.stop()
+        return self.start(token, webhook_url, port)
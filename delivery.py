@@ -0,0 +1,278 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import exceptions
+import metrics
+from breaker import CircuitBreaker
+from lifecycle import WAKEUP_INTERVAL
+
+MESSAGE_LIMIT = 4096
+RETRY_BASE = 5
+RETRY_MAX = 300
+MIN_SEND_TIMEOUT = 1
+SEPARATOR = '\n\n'
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Выдерживает общий и поканальный интервалы между отправками."""
+
+    def __init__(self, global_rate, chat_interval):
+        """Задаёт лимит сообщений в секунду и паузу для одного чата."""
+        self.global_interval = 1 / global_rate
+        self.chat_interval = chat_interval
+        self.lock = threading.Lock()
+        self.last_sent = 0
+        self.chat_last_sent = {}
+
+    def wait(self, chat_id):
+        """Ждёт, пока в чат chat_id можно будет отправить сообщение.
+        Время отправки резервируется под блокировкой, поэтому несколько
+        потоков вместе не превышают лимиты.
+        """
+        with self.lock:
+            now = time.monotonic()
+            ready = max(
+                now,
+                self.last_sent + self.global_interval,
+                self.chat_last_sent.get(chat_id, 0) + self.chat_interval,
+            )
+            self.last_sent = ready
+            self.chat_last_sent[chat_id] = ready
+        if ready > now:
+            time.sleep(ready - now)
+
+
+def is_telegram_outage(error):
+    """Проверяет, что ошибка говорит о недоступности Telegram.
+    BadRequest в python-telegram-bot - наследник NetworkError, но
+    относится к одному чату и не должен размыкать общий предохранитель.
+    """
+    import telegram
+
+    return (
+        isinstance(error, telegram.error.NetworkError)
+        and not isinstance(error, telegram.error.BadRequest)
+    )
+
+
+def pause(seconds, stop=None):
+    """Спит seconds секунд, пока stop не запросит остановку.
+    stop проверяется каждые WAKEUP_INTERVAL секунд. Возвращает False, если
+    во время паузы запрошена остановка.
+    """
+    if stop is None:
+        time.sleep(seconds)
+        return True
+    deadline = time.monotonic() + seconds
+    while not stop.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        time.sleep(min(remaining, WAKEUP_INTERVAL))
+    return False
+
+
+def send_timeout(deadline):
+    """Параметры отправки, не дающие ей затянуться после deadline."""
+    if deadline is None:
+        return {}
+    return {'timeout': max(deadline - time.monotonic(), MIN_SEND_TIMEOUT)}
+
+
+def coalesce(items):
+    """Склеивает сообщения для одного чата в пачки не длиннее лимита."""
+    batches = []
+    batch, length = [], 0
+    for message, callbacks in items:
+        extra = len(message) + (len(SEPARATOR) if batch else 0)
+        if batch and length + extra > MESSAGE_LIMIT:
+            batches.append(batch)
+            batch, length = [], 0
+            extra = len(message)
+        batch.append((message, callbacks))
+        length += extra
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений в Telegram.
+    Сообщения для одного чата отправляются одним сообщением, с учётом
+    лимитов Telegram и паузы из ответа RetryAfter. Недоставленные
+    сообщения остаются в очереди, а повтор для чата откладывается с
+    экспоненциальной паузой от retry_base до retry_max секунд.
+    """
+
+    def __init__(self, bot, limiter, max_attempts=3, breaker=None,
+                 retry_base=RETRY_BASE, retry_max=RETRY_MAX):
+        """Создаёт пустую очередь для бота bot."""
+        self.bot = bot
+        self.limiter = limiter
+        self.max_attempts = max_attempts
+        self.breaker = breaker or CircuitBreaker(
+            'telegram', is_failure=is_telegram_outage)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lock = threading.Lock()
+        self.pending = OrderedDict()
+        self.failures = {}
+        self.retry_at = {}
+
+    def put(self, chat_id, message, callback=None):
+        """Ставит сообщение в очередь; callback вызывается после доставки.
+        Такое же сообщение, уже ждущее отправки в чат, не дублируется:
+        после доставки вызываются колбэки обоих.
+        """
+        callbacks = [callback] if callback else []
+        with self.lock:
+            self.merge(self.pending.setdefault(chat_id, []),
+                       [(message, callbacks)])
+
+    @staticmethod
+    def merge(items, added):
+        """Добавляет к items сообщения added без повторов текста."""
+        known = {message: callbacks for message, callbacks in items}
+        for message, callbacks in added:
+            if message in known:
+                known[message].extend(callbacks)
+            else:
+                known[message] = callbacks
+                items.append((message, callbacks))
+        return items
+
+    def requeue(self, chat_id, items):
+        """Возвращает неотправленные сообщения в начало очереди чата."""
+        with self.lock:
+            self.pending[chat_id] = self.merge(
+                list(items), self.pending.get(chat_id, []))
+
+    def postpone(self, chat_id, items):
+        """Возвращает сообщения в очередь и откладывает повтор для чата."""
+        with self.lock:
+            failures = self.failures.get(chat_id, 0) + 1
+            self.failures[chat_id] = failures
+            delay = min(self.retry_base * 2 ** (failures - 1), self.retry_max)
+            self.retry_at[chat_id] = time.monotonic() + delay
+        self.requeue(chat_id, items)
+        logger.warning(
+            f'Сообщения для чата {chat_id} не доставлены, '
+            f'повтор через {delay} с'
+        )
+
+    def chats(self):
+        """Возвращает чаты, сообщения которых можно отправлять сейчас."""
+        now = time.monotonic()
+        with self.lock:
+            return [
+                chat_id for chat_id in self.pending
+                if self.retry_at.get(chat_id, 0) <= now
+            ]
+
+    def time_to_retry(self):
+        """Возвращает паузу до ближайшего отложенного повтора отправки.
+        Если отложенных сообщений нет, возвращает math.inf.
+        """
+        with self.lock:
+            times = [
+                self.retry_at[chat_id] for chat_id in self.pending
+                if chat_id in self.retry_at
+            ]
+        if not times:
+            return math.inf
+        return max(min(times) - time.monotonic(), 0)
+
+    def drain(self, chat_id=None, deadline=None, stop=None):
+        """Отправляет накопленные сообщения всех чатов или только chat_id.
+        Чаты с отложенным повтором пропускаются до его срока. После
+        момента deadline по time.monotonic() отправка прекращается, и
+        оставшиеся сообщения отбрасываются: их изменения будут найдены при
+        следующем опросе. После запроса остановки stop (Lifecycle)
+        неотправленное остаётся в очереди для shutdown.
+        """
+        now = time.monotonic()
+        with self.lock:
+            chats = list(self.pending) if chat_id is None else [chat_id]
+            pending = [
+                (chat_id, self.pending.pop(chat_id)) for chat_id in chats
+                if chat_id in self.pending
+                and self.retry_at.get(chat_id, 0) <= now
+            ]
+        for number, (chat_id, items) in enumerate(pending):
+            batches = coalesce(items)
+            for index, batch in enumerate(batches):
+                if deadline is not None and time.monotonic() >= deadline:
+                    logger.warning('Не хватило времени на отправку сообщений')
+                    return
+                if self.deliver(chat_id, batch, deadline, stop):
+                    continue
+                unsent = [item for rest in batches[index:] for item in rest]
+                if stop is not None and stop.is_set():
+                    self.requeue(chat_id, unsent)
+                    for later in pending[number + 1:]:
+                        self.requeue(*later)
+                    return
+                self.postpone(chat_id, unsent)
+                break
+            else:
+                with self.lock:
+                    self.failures.pop(chat_id, None)
+                    self.retry_at.pop(chat_id, None)
+
+    def deliver(self, chat_id, batch, deadline=None, stop=None):
+        """Отправляет пачку сообщений, повторяя попытку после RetryAfter.
+        Повтора нет, если пауза RetryAfter закончится позже deadline или
+        во время паузы запрошена остановка stop. С deadline таймаут
+        запроса к Telegram не выходит за него.
+        """
+        import telegram
+
+        text = SEPARATOR.join(message for message, _ in batch)
+        for _ in range(self.max_attempts):
+            self.limiter.wait(chat_id)
+            try:
+                logger.info(f'Начали отправку сообщения "{text}" в Telegram')
+                start = time.monotonic()
+                self.breaker.call(
+                    self.bot.send_message, chat_id=chat_id, text=text,
+                    **send_timeout(deadline))
+            except exceptions.CircuitOpenError as error:
+                metrics.TELEGRAM_MESSAGES.inc(result='circuit_open')
+                logger.warning(str(error))
+                return False
+            except telegram.error.RetryAfter as error:
+                metrics.TELEGRAM_MESSAGES.inc(result='retry_after')
+                logger.warning(
+                    f'Превышен лимит Telegram, повтор через '
+                    f'{error.retry_after} с'
+                )
+                if (deadline is not None
+                        and time.monotonic() + error.retry_after > deadline):
+                    return False
+                if not pause(error.retry_after, stop):
+                    return False
+                continue
+            except telegram.error.TelegramError as error:
+                metrics.TELEGRAM_MESSAGES.inc(result='failed')
+                logger.error(f'Ошибка: {error}')
+                return False
+            latency = time.monotonic() - start
+            metrics.TELEGRAM_MESSAGES.inc(result='sent')
+            metrics.CALL_SECONDS.observe(latency, function='send_message')
+            logger.info(
+                f'Сообщение "{text}" отправлено в Telegram',
+                extra={
+                    'telegram_latency': round(latency, 3),
+                    'chat_id': chat_id,
+                }
+            )
+            for _, callbacks in batch:
+                for callback in callbacks:
+                    callback()
+            return True
+        return False
@@ -7,7 +7,11 @@ class NotSendMessageError(Exception):
 class NonStatusCodeError(Exception):
     """Ошибка при получении ответа с сервера."""
 
-    pass
+    def __init__(self, message='', retry_after=None, status_code=None):
+        """Сохраняет код ответа и паузу из заголовка Retry-After."""
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
 
 
 class JSonDecoderError(Exception):
@@ -28,7 +32,28 @@ class EmptyAnswerFromAPI(Exception):
     pass
 
 
+class SchemaError(Exception):
+    """Записи в ответе API не соответствуют схеме."""
+
+    pass
+
+
 class NonTokenError(Exception):
     """Отсутствуют токены чата."""
 
     pass
+
+
+class WrongSubscriptionError(Exception):
+    """Некорректный реестр подписок."""
+
+    pass
+
+
+class CircuitOpenError(Exception):
+    """Вызов пропущен: предохранитель сервиса разомкнут."""
+
+    def __init__(self, message='', retry_after=None):
+        """Сохраняет время до пробного вызова."""
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -1,46 +1,116 @@
+import collections
+import contextvars
+import functools
+import itertools
 import json
 import logging
 import os
-import sys
 import time
 from http import HTTPStatus
-from logging.handlers import RotatingFileHandler
-from typing import Dict, List
-
-import requests
-import telegram
-from dotenv import load_dotenv
 
 import exceptions
+from breaker import CircuitBreaker
+import metrics
+from delivery import DeliveryQueue, RateLimiter, is_telegram_outage
+from lifecycle import WAKEUP_INTERVAL, Lifecycle
+from logs import bind_log_context, setup_logging
+from practicum import PracticumClient, ResponseCache
+from schema import HomeworkSchema, date_timestamp, make_status_enum
+from scheduler import PollScheduler, parse_retry_after
+from storage import make_store
+from streaming import STREAMED, StreamedAnswer
+from subscriptions import load_subscriptions, merge_subscriptions
+from templates import TemplateCatalog
+
+ENV_FILES = (
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'),
+    '.env',
+)
+
+
+def load_env(override=False):
+    """Загружает переменные из файла .env, если он есть.
+    python-dotenv импортируется только при наличии файла: на платформе
+    переменные приходят из окружения, и запуск не тратит на него время.
+    С override=True значения из файла заменяют уже загруженные.
+    """
+    for path in ENV_FILES:
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+
+            load_dotenv(path, override=override)
+            return
 
-load_dotenv()
+
+load_env()
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+SUBSCRIPTIONS_FILE = os.getenv('SUBSCRIPTIONS_FILE')
+STATE_FILE = os.getenv('STATE_FILE')
+LOG_DIR = os.getenv('LOG_DIR')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+BOT_COMMANDS = os.getenv('BOT_COMMANDS', '').lower() in ('1', 'true', 'yes')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_PORT = int(os.getenv('PORT', 8443))
+METRICS_PORT = os.getenv('METRICS_PORT')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
 RETRY_TIME = 600
+REVIEWING_TIME = int(os.getenv('REVIEWING_TIME', 120))
+CURSOR_OVERLAP = int(os.getenv('CURSOR_OVERLAP', 60))
+BACKOFF_BASE = int(os.getenv('BACKOFF_BASE', 30))
+BACKOFF_MAX = int(os.getenv('BACKOFF_MAX', 3600))
+BOT_MODE = os.getenv('BOT_MODE', 'sync')
+STREAMING = os.getenv('STREAMING', '').lower() in ('1', 'true', 'yes')
+CONCURRENCY = int(os.getenv('CONCURRENCY', 10))
+POOL_QUEUE = int(os.getenv('POOL_QUEUE', CONCURRENCY * 2))
+DELIVERY_KEY = 'delivery'
+WORKERS = int(os.getenv('WORKERS', 1))
+API_POOL_SIZE = int(os.getenv('API_POOL_SIZE', CONCURRENCY))
+API_TIMEOUT = float(os.getenv('API_TIMEOUT', 10))
+TELEGRAM_RATE = int(os.getenv('TELEGRAM_RATE', 30))
+CHAT_INTERVAL = float(os.getenv('CHAT_INTERVAL', 1))
+SEND_ATTEMPTS = int(os.getenv('SEND_ATTEMPTS', 3))
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+TEMPLATE_CACHE = int(os.getenv('TEMPLATE_CACHE', 1024))
+BREAKER_RECOVERY = int(os.getenv('BREAKER_RECOVERY', 60))
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 10))
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
-BASE_DIR = os.path.abspath(__file__)
 
 VERDICTS = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+NO_RECORDS = frozenset()
+RECENT_RECORDS = 256
+MESSAGE_FORMAT = (
+    'Изменился статус проверки работы "{homework_name}". {verdict}'
+)
+Status = make_status_enum(VERDICTS)
+HOMEWORK_SCHEMA = HomeworkSchema(Status)
 
 logger = logging.getLogger(__name__)
-formatter = '%(asctime)s - %(name)s - %(funcName)s - %(lineno)d - %(message)s'
-stream_handler = logging.StreamHandler(sys.stdout)
-stream_handler.setFormatter(logging.Formatter(formatter))
-logger.addHandler(stream_handler)
-handler = RotatingFileHandler(
-    BASE_DIR, maxBytes=50000000, backupCount=5, encoding='UTF-8')
-logger.addHandler(handler)
+
+api_client = PracticumClient(pool_size=API_POOL_SIZE, timeout=API_TIMEOUT)
+response_cache = ResponseCache()
+template_catalog = TemplateCatalog(
+    MESSAGE_FORMAT, VERDICTS, cache_size=TEMPLATE_CACHE)
+api_breaker = CircuitBreaker(
+    'practicum', BREAKER_THRESHOLD, BREAKER_RECOVERY,
+    is_failure=lambda error: is_api_outage(error),
+)
+scheduler = PollScheduler(
+    RETRY_TIME, REVIEWING_TIME, BACKOFF_BASE, BACKOFF_MAX)
+command_interface = None
 
 
+@metrics.timed('send_message')
 def send_message(bot, message):
     """Отправляет сообщение в Telegram чат."""
+    import telegram
+
     try:
         logger.info(f'Начали отправку сообщения "{message}" в Telegram')
         bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
@@ -53,24 +123,80 @@ def send_message(bot, message):
 
 def get_api_answer(current_timestamp):
     """Делает запрос к единственному эндпоинту API-сервиса."""
+    return get_tenant_answer(PRACTICUM_TOKEN, current_timestamp)
+
+
+def is_api_outage(error):
+    """Проверяет, что ошибка говорит о недоступности API, а не о подписке."""
+    if isinstance(error, exceptions.NonStatusCodeError):
+        return (
+            error.status_code is None
+            or error.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+            or error.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        )
+    return isinstance(
+        error, (exceptions.WrongStatusCodeError, ConnectionError))
+
+
+@metrics.timed('get_api_answer')
+def get_tenant_answer(token, current_timestamp):
+    """Делает запрос к API-сервису с токеном подписки.
+    Пока API недоступен, запросы отклоняются предохранителем. Итог
+    запроса с потоковым ответом учитывается после чтения тела в
+    answer_records: обрыв посреди тела - тоже сбой API.
+    """
+    if not STREAMING:
+        return api_breaker.call(request_answer, token, current_timestamp)
+    api_breaker.before_call()
+    try:
+        answer = request_answer(token, current_timestamp)
+    except Exception as error:
+        api_breaker.record(error)
+        raise
+    if not isinstance(answer, StreamedAnswer) or answer.consumed:
+        api_breaker.record_success()
+    return answer
+
+
+def request_answer(token, current_timestamp):
+    """Выполняет запрос к API и разбирает ответ."""
+    import requests
+
     timestamp = current_timestamp
     params = {'from_date': timestamp}
     api_answer = {
         'url': ENDPOINT,
-        'headers': HEADERS,
+        'headers': {
+            'Authorization': f'OAuth {token}',
+            **response_cache.conditional_headers(token, timestamp),
+        },
         'params': params
     }
-    logger.info('Начали запрос к API {url}, {headers}, {params}'.format(
-        **api_answer))
+    logger.info('Начали запрос к API {url}, {params}'.format(**api_answer))
     try:
-        response = requests.get(**api_answer)
-        if response.status_code != HTTPStatus.OK:
+        start = time.monotonic()
+        response = api_client.get(**api_answer, stream=STREAMING)
+        logger.info(
+            f'Получен ответ API с кодом {response.status_code}',
+            extra={
+                'api_latency': round(time.monotonic() - start, 3),
+                'http_status': response.status_code,
+            }
+        )
+        if response.status_code not in (
+                HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
             raise exceptions.NonStatusCodeError(
-                f'{response.status_code}, {response.reason}'
-                f'{response.raise_for_status()}'
+                f'{response.status_code}, {response.reason}',
+                retry_after=parse_retry_after(
+                    response.headers.get('Retry-After')),
+                status_code=response.status_code,
             )
         logger.info('Соединение с сервером установлено!')
-        return response.json()
+        if STREAMING:
+            return response_cache.stream(token, timestamp, response)
+        return response_cache.parse(token, timestamp, response)
+    except exceptions.NonStatusCodeError:
+        raise
     except json.decoder.JSONDecodeError:
         raise exceptions.JSonDecoderError('Ошибка преобразования в JSON')
     except requests.RequestException as request_error:
@@ -79,19 +205,20 @@ def get_api_answer(current_timestamp):
         )
     except Exception:
         raise ConnectionError(
-            '(Exception) {url}, {headers}, {params}'.format(**api_answer)
+            '(Exception) {url}, {params}'.format(**api_answer)
         )
 
 
+@metrics.timed('check_response')
 def check_response(response):
     """Проверяет ответ API на корректность."""
     logger.info('Начали проверку ответа API')
-    if not isinstance(response, Dict):
+    if not isinstance(response, dict):
         raise TypeError('Ответ API не является словарем')
     if 'homeworks' not in response:
         raise exceptions.EmptyAnswerFromAPI('Пустой ответ от API')
     homeworks = response.get('homeworks')
-    if not isinstance(homeworks, List):
+    if not isinstance(homeworks, list):
         raise TypeError('homeworks не является списком')
     return homeworks
 
@@ -103,11 +230,15 @@ def parse_status(homework):
     homework_status = homework.get('status')
     if homework_status not in VERDICTS:
         raise ValueError('status отсутствует в словаре VERDICTS')
-    return 'Изменился статус проверки работы "{homework_name}".' \
-           ' {verdict}'.format(
-               homework_name=homework.get('homework_name'),
-               verdict=VERDICTS.get(homework_status)
-           )
+    return format_status(homework.get('homework_name'), homework_status)
+
+
+def format_status(homework_name, status, templates=None):
+    """Формирует сообщение о статусе уже проверенной работы.
+    templates - шаблоны подписки, по умолчанию - MESSAGE_FORMAT и VERDICTS.
+    """
+    return (templates or template_catalog.default).render(
+        homework_name, status)
 
 
 def check_tokens():
@@ -117,6 +248,8 @@ def check_tokens():
         ('Токен телеграм-бота', TELEGRAM_TOKEN),
         ('Чат ID', TELEGRAM_CHAT_ID),
     )
+    if SUBSCRIPTIONS_FILE:
+        token_list = (('Токен телеграм-бота', TELEGRAM_TOKEN),)
     answer = True
     for name, token in token_list:
         if not token:
@@ -125,43 +258,727 @@ def check_tokens():
     return answer
 
 
+def is_new_record(subscription, homework, updated):
+    """Проверяет, что запись ещё не была учтена.
+    Новая запись меняет статус либо обновлена (updated) после прошлого
+    курсора с учётом окна перекрытия и не встречалась в прошлом ответе.
+    Пока прошлый ответ неизвестен (после перезапуска), окно не учитывается.
+    """
+    if subscription.statuses.get(homework.key) != homework.status:
+        return True
+    if updated is None:
+        return False
+    if subscription.seen is None:
+        return updated > subscription.timestamp
+    fingerprint = (homework.key, homework.status, homework.date_updated)
+    return (
+        updated > subscription.timestamp - CURSOR_OVERLAP
+        and fingerprint not in subscription.seen
+    )
+
+
+def is_first_poll(subscription):
+    """Проверяет, что у подписки нет ни курсора, ни известных статусов."""
+    return (
+        not subscription.timestamp
+        and not subscription.statuses
+        and not subscription.pending
+    )
+
+
+def skip_history(subscription, found):
+    """Запоминает статусы истории работ без уведомлений.
+    На первом опросе в ответе вся история, поэтому уведомление
+    готовится только о самой новой работе, как было до обработки всех
+    работ ответа. Возвращает список из неё или пустой список.
+    """
+    for homework in found[1:]:
+        subscription.names[homework.key] = homework.homework_name
+        subscription.statuses[homework.key] = homework.status
+    return found[:1]
+
+
+def remember_records(subscription, recent, current_date):
+    """Запоминает записи, которые ещё попадут в окно перекрытия.
+    recent - пары (время обновления, работа).
+    """
+    horizon = current_date - CURSOR_OVERLAP
+    seen = frozenset(
+        (homework.key, homework.status, homework.date_updated)
+        for updated, homework in recent
+        if updated > horizon
+    )
+    subscription.seen = seen or NO_RECORDS
+
+
+def diff_statuses(subscription, homeworks):
+    """Возвращает домашние работы, статус которых изменился.
+    Повторы записей из окна перекрытия отбрасываются по
+    (id, status, date_updated).
+    """
+    return [
+        homework for homework in homeworks
+        if is_new_record(
+            subscription, homework, date_timestamp(homework.date_updated))
+    ]
+
+
+def answer_records(response):
+    """Отдаёт сырые записи homeworks ответа API по одной.
+    Ответ - словарь или StreamedAnswer, который разбирается по мере
+    чтения. Ошибки чтения и разбора потока переводятся в ошибки бота, а
+    итог чтения тела учитывается предохранителем API.
+    """
+    if not isinstance(response, StreamedAnswer):
+        yield from check_response(response)
+        return
+    import requests
+
+    fresh = not response.consumed
+    outcome = None
+    try:
+        yield from response.records()
+    except json.decoder.JSONDecodeError:
+        outcome = exceptions.JSonDecoderError('Ошибка преобразования в JSON')
+        raise outcome
+    except requests.RequestException as request_error:
+        outcome = exceptions.WrongStatusCodeError(
+            f'Код ответа API (RequestException): {request_error}'
+        )
+        raise outcome
+    finally:
+        if fresh:
+            api_breaker.record(outcome)
+    if 'homeworks' not in response.fields:
+        raise exceptions.EmptyAnswerFromAPI('Пустой ответ от API')
+    if response.fields['homeworks'] is not STREAMED:
+        raise TypeError('homeworks не является списком')
+
+
+def checked_records(response, errors):
+    """Отдаёт пары (время обновления, работа) по записям ответа.
+    Записи проверяются схемой по одной, ошибки добавляются в errors.
+    """
+    for number, raw in enumerate(answer_records(response)):
+        homework, error = HOMEWORK_SCHEMA.check(raw, number)
+        if error:
+            errors.append(error)
+        else:
+            yield date_timestamp(homework.date_updated), homework
+
+
+@metrics.timed('parse_status')
+def make_changes(subscription, changed):
+    """Готовит сообщения об изменениях подписки.
+    Работы в ответе API идут от новых к старым, сообщения - наоборот.
+    Время подготовки попадает в метрику под прежним именем parse_status.
+    """
+    for homework in changed:
+        subscription.names[homework.key] = homework.homework_name
+    return [
+        (
+            homework.key, homework.status,
+            format_status(
+                homework.homework_name, homework.status,
+                subscription.templates,
+            ),
+        )
+        for homework in reversed(changed)
+    ]
+
+
+def collect_group(group, response, from_date=None):
+    """Готовит изменения для подписок группы за один проход по ответу.
+    Каждая запись сразу сравнивается с состоянием всех подписок, поэтому
+    ответ, разбираемый потоком, не собирается в памяти целиком. Для окна
+    перекрытия хранятся только записи не старше самой новой из
+    прочитанных на CURSOR_OVERLAP. С from_date подписка с более поздним
+    курсором видит только записи, обновлённые не раньше него.
+    Возвращает пары (изменения, ошибки схемы) по подпискам группы.
+    """
+    replay = isinstance(response, StreamedAnswer) and response.consumed
+    floors = [
+        cursor(item) if from_date is not None and cursor(item) > from_date
+        else None
+        for item in group
+    ]
+    horizon = min(subscription.timestamp for subscription in group)
+    limit = RECENT_RECORDS
+    changed = [[] for _ in group]
+    recent, errors = [], []
+    count = 0
+    for updated, homework in checked_records(response, errors):
+        count += 1
+        if updated is not None and updated > horizon - CURSOR_OVERLAP:
+            recent.append((updated, homework))
+            if len(recent) > limit:
+                horizon = max(horizon, max(date for date, _ in recent))
+                recent = [
+                    item for item in recent
+                    if item[0] > horizon - CURSOR_OVERLAP
+                ]
+                limit = max(RECENT_RECORDS, len(recent) * 2)
+        for subscription, floor, found in zip(group, floors, changed):
+            if floor is not None and updated is not None and updated < floor:
+                continue
+            if is_new_record(subscription, homework, updated):
+                found.append(homework)
+    count += len(errors)
+    logger.info(f'Получено работ: {count}', extra={'homeworks': count})
+    results = []
+    for subscription, found in zip(group, changed):
+        if is_first_poll(subscription):
+            found = skip_history(subscription, found)
+        if not replay:
+            remember_records(
+                subscription, recent,
+                response.get('current_date', subscription.timestamp))
+        results.append((make_changes(subscription, found), errors))
+    return results
+
+
+def collect_changes(subscription, response):
+    """Готовит сообщения обо всех изменившихся статусах из ответа API.
+    Возвращает изменения и список ошибок схемы в некорректных записях.
+    """
+    return collect_group([subscription], response)[0]
+
+
+def finish_poll(subscription, response, changes, clear_error=True):
+    """Обновляет состояние подписки после успешного запроса к API.
+    Прошлая ошибка забывается, только если clear_error: иначе повтор той
+    же ошибки схемы не отправляется в чат заново.
+    """
+    if clear_error:
+        subscription.last_error = None
+    subscription.expect(
+        changes, response.get('current_date', subscription.timestamp))
+    latest = {**subscription.statuses, **subscription.pending}
+    subscription.reviewing = 'reviewing' in latest.values()
+    scheduler.success(subscription)
+
+
+def make_error_report(subscription, error):
+    """Логирует сбой и возвращает сообщение о нём, если оно новое для чата."""
+    if isinstance(error, exceptions.EmptyAnswerFromAPI):
+        logger.error(f'Пустой ответ от API {error}')
+        return None
+    if isinstance(error, exceptions.CircuitOpenError):
+        logger.warning(str(error))
+        return None
+    message = f'Сбой в работе программы: {error}'
+    logger.error(message)
+    if message == subscription.last_error:
+        return None
+    subscription.last_error = message
+    return message
+
+
+def needs_diff(subscription, response):
+    """Проверяет, нужно ли сравнивать ответ с состоянием подписки.
+    Повторный ответ из кэша не проверяется заново, если всё доставлено.
+    """
+    return response is not subscription.last_response or subscription.pending
+
+
+def handle_answer(queue, subscription, response):
+    """Ставит в очередь сообщения об изменениях из ответа API."""
+    changes, errors = [], []
+    if needs_diff(subscription, response):
+        changes, errors = collect_changes(subscription, response)
+    apply_answer(queue, subscription, response, changes, errors)
+
+
+def apply_answer(queue, subscription, response, changes, errors):
+    """Обновляет подписку и ставит в очередь сообщения об изменениях.
+    Недоставленные ранее изменения ставятся в очередь повторно.
+    """
+    replay = response is subscription.last_response
+    subscription.last_response = response
+    if not changes:
+        logger.info('Нет новых статусов')
+    finish_poll(
+        subscription, response, changes,
+        clear_error=not errors and not replay,
+    )
+    messages = {key: message for key, _, message in changes}
+    for key, status in list(subscription.pending.items()):
+        message = messages.get(key) or format_status(
+            subscription.names.get(key, key), status, subscription.templates)
+        queue.put(
+            subscription.chat_id, message,
+            functools.partial(subscription.confirm, key),
+        )
+    if errors:
+        message = make_error_report(
+            subscription, exceptions.SchemaError('; '.join(errors)))
+        if message:
+            queue.put(subscription.chat_id, message)
+
+
+def handle_error(queue, subscription, error):
+    """Планирует повтор опроса и ставит в очередь сообщение о сбое."""
+    scheduler.failure(subscription, error)
+    message = make_error_report(subscription, error)
+    if message:
+        queue.put(subscription.chat_id, message)
+
+
+def cursor(subscription):
+    """Возвращает from_date запроса: курсор минус окно перекрытия.
+    Окно защищает от расхождения часов бота и API.
+    """
+    return max(subscription.timestamp - CURSOR_OVERLAP, 0)
+
+
+def group_by_token(subscriptions):
+    """Разбивает подписки на группы с общим токеном Практикума."""
+    groups = {}
+    for subscription in subscriptions:
+        groups.setdefault(subscription.token, []).append(subscription)
+    return list(groups.values())
+
+
+def due_groups(subscriptions):
+    """Возвращает подошедшие подписки, сгруппированные по токену.
+    Подписки с общим токеном делят слоты планировщика, поэтому подходят
+    вместе, и на группу делается один запрос к API.
+    """
+    return group_by_token(scheduler.due(subscriptions))
+
+
+def active_members(group):
+    """Возвращает подписки группы не на паузе, остальных откладывает."""
+    active = []
+    for subscription in group:
+        if subscription.paused:
+            scheduler.success(subscription)
+        else:
+            active.append(subscription)
+    return active
+
+
+def fan_out(queue, group, response, error, from_date):
+    """Раздаёт подпискам группы общий ответ API или ошибку запроса.
+    Ответ проходится один раз для всех подписок группы.
+    """
+    metrics.API_REQUESTS.inc(result='upstream')
+    if len(group) > 1:
+        metrics.API_REQUESTS.inc(len(group) - 1, result='shared')
+    results = {}
+    if error is None:
+        needed = [item for item in group if needs_diff(item, response)]
+        try:
+            if needed:
+                results = dict(zip(
+                    map(id, needed),
+                    collect_group(needed, response, from_date),
+                ))
+        except Exception as answer_error:
+            error = answer_error
+    for subscription in group:
+        bind_log_context(tenant=subscription.key)
+        if error is not None:
+            handle_error(queue, subscription, error)
+            continue
+        changes, errors = results.get(id(subscription), ([], []))
+        try:
+            apply_answer(queue, subscription, response, changes, errors)
+        except Exception as answer_error:
+            handle_error(queue, subscription, answer_error)
+
+
+def poll_group(queue, group):
+    """Опрашивает API один раз для подписок с общим токеном.
+    Запрос идёт с самым ранним курсором группы, и его ответ расходится
+    по всем чатам группы.
+    """
+    group = active_members(group)
+    if not group:
+        return
+    bind_log_context(tenant=group[0].key)
+    from_date = min(cursor(subscription) for subscription in group)
+    response, error = None, None
+    try:
+        response = get_tenant_answer(group[0].token, from_date)
+    except Exception as request_error:
+        error = request_error
+    fan_out(queue, group, response, error, from_date)
+
+
+def poll_subscription(queue, subscription):
+    """Опрашивает API для одной подписки и ставит изменения в очередь."""
+    poll_group(queue, [subscription])
+
+
+async def async_get_api_answer(token, current_timestamp):
+    """Делает запрос к API-сервису, не блокируя цикл событий."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        None, context.run, get_tenant_answer, token, current_timestamp)
+
+
+async def async_send_messages(queue, stop=None):
+    """Отправляет очередь сообщений в Telegram, не блокируя цикл событий.
+    Чаты отправляются параллельно, общий темп держит RateLimiter.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(
+        loop.run_in_executor(None, queue.drain, chat_id, None, stop)
+        for chat_id in queue.chats()
+    ))
+
+
+async def async_poll_group(queue, group, semaphore):
+    """Асинхронно опрашивает API один раз для подписок с общим токеном.
+    Ответ разбирается в пуле потоков: потоковый ответ читается из сети
+    по мере разбора и не должен блокировать цикл событий.
+    """
+    import asyncio
+
+    async with semaphore:
+        group = active_members(group)
+        if not group:
+            return
+        bind_log_context(tenant=group[0].key)
+        from_date = min(cursor(subscription) for subscription in group)
+        response, error = None, None
+        try:
+            response = await async_get_api_answer(group[0].token, from_date)
+        except Exception as request_error:
+            error = request_error
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        await loop.run_in_executor(
+            None, context.run, fan_out, queue, group, response, error,
+            from_date,
+        )
+
+
+async def async_poll_subscription(queue, subscription, semaphore):
+    """Асинхронно опрашивает API для одной подписки."""
+    await async_poll_group(queue, [subscription], semaphore)
+
+
+async def async_main(queue, subscriptions, store, stop=None):
+    """Опрашивает подписки параллельно, не более CONCURRENCY одновременно.
+    Цикл завершается, когда stop (Lifecycle) запрашивает остановку.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=CONCURRENCY))
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    stop = stop or Lifecycle()
+    try:
+        for cycle in itertools.count(1):
+            if stop.is_set():
+                return
+            if stop.take_reload():
+                save_state(store, reload_config(queue, subscriptions, store))
+            bind_log_context(cycle=cycle, tenant=None)
+            groups = due_groups(subscriptions)
+            await asyncio.gather(*(
+                async_poll_group(queue, group, semaphore) for group in groups
+            ))
+            await async_send_messages(queue, stop)
+            save_state(store, itertools.chain.from_iterable(groups))
+            await loop.run_in_executor(None, stop.wait, min(
+                scheduler.time_to_next(subscriptions),
+                queue.time_to_retry(),
+            ))
+    finally:
+        shutdown(queue, subscriptions, store, stop)
+
+
+def save_state(store, subscriptions):
+    """Сохраняет состояние опрошенных подписок."""
+    for subscription in subscriptions:
+        store.save(subscription)
+    store.flush()
+
+
+def poll_cycle(queue, subscriptions, store, cycle, stop=None):
+    """Опрашивает подошедшие подписки и отправляет уведомления.
+    Возвращает паузу до следующего цикла в секундах. При запросе остановки
+    цикл прерывается, отправку и сохранение выполняет shutdown.
+    """
+    bind_log_context(cycle=cycle, tenant=None)
+    groups = due_groups(subscriptions)
+    for group in groups:
+        if stop is not None and stop.is_set():
+            return 0
+        poll_group(queue, group)
+    bind_log_context(tenant=None)
+    queue.drain(stop=stop)
+    save_state(store, itertools.chain.from_iterable(groups))
+    return min(scheduler.time_to_next(subscriptions), queue.time_to_retry())
+
+
+def shutdown(queue, subscriptions, store, stop=None):
+    """Сохраняет состояние и отправляет накопленные сообщения перед выходом.
+    Состояние сохраняется до отправки: курсор недоставленных изменений
+    сохраняется до них, и они найдутся после запуска, даже если процесс
+    будет убит во время отправки. На отправку отводится SHUTDOWN_TIMEOUT
+    секунд с момента запроса остановки stop (Lifecycle): платформа даёт на
+    остановку 30 секунд, считая от сигнала.
+    """
+    bind_log_context(tenant=None)
+    started = time.monotonic()
+    if stop is not None and stop.stopped_at is not None:
+        started = stop.stopped_at
+    save_state(store, subscriptions)
+    logger.info('Остановка: отправка накопленных сообщений')
+    queue.drain(deadline=started + SHUTDOWN_TIMEOUT)
+    save_state(store, subscriptions)
+    logger.info('Состояние подписок сохранено')
+
+
+def reload_config(queue, subscriptions, store, load_state=True):
+    """Перечитывает .env, токены и реестр подписок по SIGHUP.
+    Список subscriptions обновляется на месте: оставшиеся подписки сохраняют
+    состояние, новые загружают его из хранилища, если load_state (воркер
+    загружает его только для своей доли). Соединения с API и кэши
+    остаются прежними, бот пересоздаётся только при смене токена. При
+    ошибке в настройках остаются прежние. Возвращает удалённые подписки.
+    """
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
+    global SUBSCRIPTIONS_FILE
+
+    logger.info('Перезагрузка настроек')
+    previous = (
+        PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, SUBSCRIPTIONS_FILE)
+    load_env(override=True)
+    PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
+    TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
+    TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+    SUBSCRIPTIONS_FILE = os.getenv('SUBSCRIPTIONS_FILE')
+    try:
+        if not check_tokens():
+            raise exceptions.NonTokenError('Отсутствует токен(ы)')
+        loaded = load_subscriptions(
+            SUBSCRIPTIONS_FILE, PRACTICUM_TOKEN, TELEGRAM_CHAT_ID,
+            template_catalog,
+        )
+    except (exceptions.NonTokenError,
+            exceptions.WrongSubscriptionError) as error:
+        logger.error(f'Настройки не перезагружены: {error}')
+        (PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID,
+         SUBSCRIPTIONS_FILE) = previous
+        return []
+    if TELEGRAM_TOKEN != previous[1]:
+        import telegram
+
+        queue.bot = telegram.Bot(token=TELEGRAM_TOKEN)
+        if command_interface is not None:
+            command_interface.restart(
+                TELEGRAM_TOKEN, WEBHOOK_URL, WEBHOOK_PORT)
+    merged, added, removed = merge_subscriptions(subscriptions, loaded)
+    if load_state:
+        for subscription in added:
+            store.load(subscription)
+        scheduler.spread(added)
+    subscriptions[:] = merged
+    scheduler.invalidate()
+    metrics.SUBSCRIPTIONS.set(len(subscriptions))
+    logger.info(
+        f'Настройки перезагружены: подписок {len(subscriptions)}, '
+        f'новых {len(added)}, удалённых {len(removed)}'
+    )
+    return removed
+
+
+def run_polling(queue, subscriptions, store, stop=None):
+    """Опрашивает подписки по очереди, пока stop не запросит остановку.
+    stop - Lifecycle: по SIGHUP между циклами перечитываются настройки.
+    """
+    stop = stop or Lifecycle()
+    try:
+        for cycle in itertools.count(1):
+            if stop.is_set():
+                return
+            if stop.take_reload():
+                save_state(store, reload_config(queue, subscriptions, store))
+            stop.wait(poll_cycle(queue, subscriptions, store, cycle, stop))
+    finally:
+        shutdown(queue, subscriptions, store, stop)
+
+
+def poll_and_deliver(queue, group, stop=None):
+    """Опрашивает группу в потоке пула и сразу отправляет её сообщения."""
+    poll_group(queue, group)
+    for chat_id in dict.fromkeys(item.chat_id for item in group):
+        queue.drain(chat_id, stop=stop)
+
+
+def submit_group(pool, queue, group, finished, stop):
+    """Ставит опрос группы в пул; завершённые группы попадают в finished.
+    До завершения опроса группе назначается опрос через RETRY_TIME, а
+    группа, не принятая пулом, проверяется снова через WAKEUP_INTERVAL.
+    """
+    for subscription in group:
+        scheduler.schedule(subscription, scheduler.retry_time)
+    future = pool.submit(group[0].token, poll_and_deliver, queue, group, stop)
+    if future is None:
+        for subscription in group:
+            scheduler.schedule(subscription, WAKEUP_INTERVAL)
+        return
+    future.add_done_callback(lambda _: finished.append(group))
+
+
+def run_threaded(queue, subscriptions, store, stop=None):
+    """Опрашивает подписки в пуле из CONCURRENCY потоков.
+    Задача пула - группа подписок с общим токеном. Группа не попадает в
+    пул, пока не завершён её предыдущий опрос, а при POOL_QUEUE
+    незавершённых задачах цикл ждёт освобождения места. Отложенные
+    повторы отправки выполняются отдельной задачей пула.
+    """
+    from pool import TenantPool
+
+    stop = stop or Lifecycle()
+    pool = TenantPool(CONCURRENCY, POOL_QUEUE)
+    finished = collections.deque()
+    try:
+        for cycle in itertools.count(1):
+            if stop.is_set():
+                return
+            if stop.take_reload():
+                save_state(store, reload_config(queue, subscriptions, store))
+            bind_log_context(cycle=cycle, tenant=None)
+            for group in due_groups(subscriptions):
+                submit_group(pool, queue, group, finished, stop)
+            if queue.time_to_retry() == 0:
+                pool.submit(DELIVERY_KEY, queue.drain, None, None, stop)
+            done = []
+            while finished:
+                done.extend(finished.popleft())
+            save_state(store, done)
+            stop.wait(min(
+                scheduler.time_to_next(subscriptions),
+                max(queue.time_to_retry(), WAKEUP_INTERVAL),
+            ))
+    finally:
+        pool.shutdown(cancel=True)
+        shutdown(queue, subscriptions, store, stop)
+
+
+def prepare(workers=1):
+    """Создаёт очередь доставки, загружает подписки и их состояние.
+    Воркер из workers получает долю TELEGRAM_RATE, чтобы вместе они не
+    превышали лимит бота, а состояние загружает только для своей доли
+    подписок в Shard.assign.
+    """
+    import telegram
+
+    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    queue = DeliveryQueue(
+        bot, RateLimiter(TELEGRAM_RATE / workers, CHAT_INTERVAL),
+        SEND_ATTEMPTS,
+        CircuitBreaker(
+            'telegram', BREAKER_THRESHOLD, BREAKER_RECOVERY,
+            is_failure=is_telegram_outage,
+        ),
+    )
+    subscriptions = load_subscriptions(
+        SUBSCRIPTIONS_FILE, PRACTICUM_TOKEN, TELEGRAM_CHAT_ID,
+        template_catalog,
+    )
+    logger.info(f'Загружено подписок: {len(subscriptions)}')
+    store = make_store(STATE_FILE)
+    if workers == 1:
+        for subscription in subscriptions:
+            store.load(subscription)
+        scheduler.spread(subscriptions)
+    return queue, subscriptions, store
+
+
+def run_worker(worker_id, connection):
+    """Воркер режима WORKERS > 1: опрашивает свою долю подписок.
+    Доля пересчитывается при каждом новом списке воркеров от супервизора,
+    None в канале или SIGTERM означают остановку, SIGHUP - перезагрузку
+    настроек.
+    """
+    from workers import Shard
+
+    logging.getLogger().handlers.clear()
+    listener = setup_logging(LOG_DIR, log_format=LOG_FORMAT)
+    bind_log_context(worker=worker_id)
+    lifecycle = Lifecycle().install()
+    queue, subscriptions, store = prepare(WORKERS)
+    if METRICS_PORT:
+        metrics.serve(int(METRICS_PORT) + worker_id, METRICS_HOST)
+    shard = Shard(worker_id, subscriptions, store, scheduler)
+    cycles = itertools.count(1)
+    members = None
+    next_cycle = 0
+    try:
+        while not lifecycle.is_set():
+            if lifecycle.take_reload():
+                reload_config(queue, subscriptions, store, load_state=False)
+                if members is not None:
+                    metrics.SUBSCRIPTIONS.set(len(shard.assign(members)))
+            delay = min(next_cycle - time.monotonic(), WAKEUP_INTERVAL)
+            if connection.poll(max(delay, 0)):
+                members = connection.recv()
+                if members is None:
+                    break
+                metrics.SUBSCRIPTIONS.set(len(shard.assign(members)))
+                next_cycle = 0
+            if members is not None and time.monotonic() >= next_cycle:
+                next_cycle = time.monotonic() + poll_cycle(
+                    queue, shard.active, store, next(cycles), lifecycle)
+    except EOFError:
+        logger.error('Супервизор завершился, воркер останавливается')
+    finally:
+        shutdown(queue, shard.active, store, lifecycle)
+        store.close()
+        listener.stop()
+
+
 def main():
     """Основная логика работы бота."""
+    setup_logging(LOG_DIR, log_format=LOG_FORMAT)
     if not check_tokens():
         logger.critical('Отсутствует токен(ы)')
         raise exceptions.NonTokenError('Отсутствует токен(ы)')
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = 0
-    current_report = {}
-    prev_report = {}
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            homeworks = check_response(response)
-            if homeworks:
-                first_homework = homeworks[0]
-                current_report['output'] = parse_status(first_homework)
-            else:
-                current_report['output'] = 'Нет новых статусов'
-            if current_report != prev_report:
-                if send_message(bot, current_report['output']):
-                    prev_report = current_report.copy()
-                    current_timestamp = response.get(
-                        'current_date', current_timestamp)
-            else:
-                logger.info('Нет новых статусов')
-        except exceptions.EmptyAnswerFromAPI as error:
-            message = f'Пустой ответ от API {error}'
-            logger.error(message)
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            current_report['output'] = message
-            if current_report != prev_report:
-                send_message(bot, current_report['output'])
-                prev_report = current_report.copy()
-            logger.error(message)
-        finally:
-            time.sleep(RETRY_TIME)
+    lifecycle = Lifecycle().install()
+    if WORKERS > 1:
+        from workers import Supervisor
+
+        if BOT_COMMANDS:
+            logger.warning('Команды бота не работают при WORKERS > 1')
+        Supervisor(WORKERS, run_worker, lifecycle=lifecycle).run()
+        return
+    queue, subscriptions, store = prepare()
+    metrics.SUBSCRIPTIONS.set(len(subscriptions))
+    if METRICS_PORT:
+        metrics.serve(int(METRICS_PORT), METRICS_HOST)
+    global command_interface
+    if BOT_COMMANDS:
+        from commands import CommandInterface
+
+        command_interface = CommandInterface(subscriptions)
+        command_interface.start(TELEGRAM_TOKEN, WEBHOOK_URL, WEBHOOK_PORT)
+    try:
+        if BOT_MODE == 'async':
+            import asyncio
+
+            asyncio.run(async_main(queue, subscriptions, store, lifecycle))
+        elif BOT_MODE == 'threads':
+            run_threaded(queue, subscriptions, store, lifecycle)
+        else:
+            run_polling(queue, subscriptions, store, lifecycle)
+    finally:
+        if command_interface is not None:
+            command_interface.stop()
+        store.close()
+    logger.info('Бот остановлен')
 
 
 if __name__ == '__main__':
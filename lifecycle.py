@@ -0,0 +1,73 @@
+import signal
+import time
+
+WAKEUP_INTERVAL = 0.5
+
+
+class Lifecycle:
+    """Сигналы остановки и перезагрузки настроек для цикла опроса.
+    Поддерживает is_set, set и wait, как threading.Event, поэтому циклы
+    опроса ждут следующего опроса через него и просыпаются по сигналу.
+    Обработчики сигналов только выставляют флаги: брать в них блокировки
+    нельзя, сигнал может прийти, пока главный поток держит ту же блокировку.
+    """
+
+    def __init__(self):
+        """Создаёт объект без запрошенной остановки и перезагрузки."""
+        self.stopping = False
+        self.reloading = False
+        self.stopped_at = None
+
+    def install(self):
+        """Назначает обработчики SIGTERM, SIGINT и SIGHUP.
+        Работает только из главного потока.
+        """
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, self.handle_reload)
+        return self
+
+    def handle_stop(self, signum, frame):
+        """Обработчик SIGTERM и SIGINT."""
+        self.set()
+
+    def handle_reload(self, signum, frame):
+        """Обработчик SIGHUP."""
+        self.reloading = True
+
+    def set(self):
+        """Запрашивает остановку и запоминает время первого запроса."""
+        if self.stopped_at is None:
+            self.stopped_at = time.monotonic()
+        self.stopping = True
+
+    def is_set(self):
+        """Проверяет, запрошена ли остановка."""
+        return self.stopping
+
+    def request_reload(self):
+        """Запрашивает перезагрузку настроек."""
+        self.reloading = True
+
+    def take_reload(self):
+        """Возвращает True один раз после каждого запроса перезагрузки."""
+        if not self.reloading:
+            return False
+        self.reloading = False
+        return True
+
+    def wait(self, timeout=None):
+        """Ждёт timeout секунд, пока не запрошены остановка или перезагрузка.
+        Флаги проверяются каждые WAKEUP_INTERVAL секунд. Возвращает True,
+        если запрошена остановка.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.stopping and not self.reloading:
+            remaining = WAKEUP_INTERVAL
+            if deadline is not None:
+                remaining = min(deadline - time.monotonic(), remaining)
+                if remaining <= 0:
+                    break
+            time.sleep(remaining)
+        return self.stopping
@@ -0,0 +1,97 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+FORMAT = '%(asctime)s - %(name)s - %(funcName)s - %(lineno)d - %(message)s'
+LOG_FILE = 'homework_bot.log'
+FIELDS = (
+    'worker', 'tenant', 'cycle', 'chat_id', 'api_latency',
+    'telegram_latency', 'http_status', 'homeworks',
+)
+SECRETS = (
+    (re.compile(r'OAuth\s+[^\s\'",}]+'), 'OAuth ***'),
+    (re.compile(r'\b\d{5,}:[\w-]{30,}\b'), '***'),
+)
+
+log_context = contextvars.ContextVar('log_context', default={})
+
+
+def bind_log_context(**fields):
+    """Добавляет поля ко всем записям лога в текущем контексте."""
+    log_context.set({**log_context.get(), **fields})
+
+
+def redact(text):
+    """Скрывает токены Практикума и Telegram в тексте."""
+    for pattern, replacement in SECRETS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет к записи поля контекста и скрывает в ней токены."""
+
+    def filter(self, record):
+        """Дополняет запись; выполняется в потоке, который её создал."""
+        for field, value in log_context.get().items():
+            if not hasattr(record, field):
+                setattr(record, field, value)
+        record.msg = redact(record.getMessage())
+        record.args = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись лога как одну строку JSON."""
+
+    def format(self, record):
+        """Собирает сообщение и структурированные поля записи."""
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'function': record.funcName,
+            'message': record.getMessage(),
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        return json.dumps(data, ensure_ascii=False)
+
+
+def setup_logging(log_dir=None, level=logging.INFO, log_format='text'):
+    """Настраивает неблокирующее логирование через очередь.
+    Записи из цикла опроса только кладутся в очередь, а в stdout и в
+    файл log_dir/homework_bot.log их пишет фоновый поток QueueListener.
+    При log_format='json' каждая запись пишется строкой JSON.
+    """
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        handlers.append(RotatingFileHandler(
+            os.path.join(log_dir, LOG_FILE),
+            maxBytes=50000000, backupCount=5, encoding='UTF-8'
+        ))
+    if log_format == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,185 @@
+import functools
+import threading
+import time
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def format_labels(labels):
+    """Форматирует метки в виде {name="value",...}."""
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in labels)
+    return '{' + pairs + '}'
+
+
+class Metric:
+    """Базовая метрика с набором значений по меткам."""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation):
+        """Создаёт метрику name с описанием documentation."""
+        self.name = name
+        self.documentation = documentation
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def render(self):
+        """Возвращает строки метрики в текстовом формате Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{format_labels(labels)} {value}')
+        return lines
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Увеличивает счётчик с метками labels."""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Текущее значение величины."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        """Задаёт значение с метками labels."""
+        with self.lock:
+            self.values[tuple(sorted(labels.items()))] = value
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам BUCKETS."""
+
+    kind = 'histogram'
+
+    def observe(self, value, **labels):
+        """Учитывает значение value с метками labels."""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            state = self.values.setdefault(key, [[0] * len(BUCKETS), 0, 0])
+            for number, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    state[0][number] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        """Возвращает корзины, сумму и количество наблюдений."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                for bound, number in zip(BUCKETS, counts):
+                    labels = format_labels(key + (('le', bound),))
+                    lines.append(f'{self.name}_bucket{labels} {number}')
+                labels = format_labels(key + (('le', '+Inf'),))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                lines.append(f'{self.name}_sum{format_labels(key)} {total}')
+                lines.append(f'{self.name}_count{format_labels(key)} {count}')
+        return lines
+
+
+class Registry:
+    """Реестр метрик процесса."""
+
+    def __init__(self):
+        """Создаёт пустой реестр."""
+        self.metrics = []
+
+    def register(self, metric):
+        """Добавляет метрику в реестр и возвращает её."""
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Возвращает все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+CALL_SECONDS = registry.register(Histogram(
+    'homework_bot_call_seconds', 'Длительность вызовов функций бота.'))
+CALL_ERRORS = registry.register(Counter(
+    'homework_bot_errors_total', 'Ошибки функций бота по классу исключения.'))
+TELEGRAM_MESSAGES = registry.register(Counter(
+    'homework_bot_telegram_messages_total',
+    'Попытки отправки сообщений в Telegram по результату.'))
+CIRCUIT_STATE = registry.register(Gauge(
+    'homework_bot_circuit_state',
+    'Состояние предохранителя: 0 - замкнут, 1 - проба, 2 - разомкнут.'))
+SUBSCRIPTIONS = registry.register(Gauge(
+    'homework_bot_subscriptions', 'Количество обслуживаемых подписок.'))
+POOL_TASKS = registry.register(Gauge(
+    'homework_bot_pool_tasks', 'Незавершённые задачи в пуле потоков.'))
+API_REQUESTS = registry.register(Counter(
+    'homework_bot_api_requests_total',
+    'Ответы API подпискам: upstream - свой запрос, shared - общий.'))
+
+
+def timed(function_name):
+    """Декоратор: замеряет длительность вызовов и считает их ошибки."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.monotonic()
+            try:
+                return func(*args, **kwargs)
+            except Exception as error:
+                CALL_ERRORS.inc(
+                    function=function_name, error=type(error).__name__)
+                raise
+            finally:
+                CALL_SECONDS.observe(
+                    time.monotonic() - start, function=function_name)
+        return wrapper
+    return decorator
+
+
+def serve(port, host='127.0.0.1'):
+    """Запускает HTTP-сервер метрик в фоновом потоке.
+    http.server импортируется здесь, чтобы не замедлять запуск бота
+    без METRICS_PORT.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Отдаёт метрики реестра по адресу /metrics."""
+
+        def do_GET(self):
+            """Отвечает текстом метрик или 404 для других адресов."""
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('UTF-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            """Не пишет запросы к метрикам в stderr."""
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
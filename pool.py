@@ -0,0 +1,58 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+
+class TenantPool:
+    """Пул потоков для блокирующих вызовов подписок.
+    Задачи одного ключа не выполняются одновременно, а число принятых,
+    но не завершённых задач ограничено max_queued: при заполнении submit
+    ждёт освобождения места.
+    """
+
+    def __init__(self, max_workers, max_queued):
+        """Создаёт пул из max_workers потоков."""
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='poll')
+        self.slots = threading.BoundedSemaphore(max_queued)
+        self.lock = threading.Lock()
+        self.running = set()
+
+    def busy(self, key):
+        """Проверяет, есть ли у ключа key незавершённая задача."""
+        with self.lock:
+            return key in self.running
+
+    def submit(self, key, func, *args, timeout=None):
+        """Ставит func(*args) в пул от имени ключа key.
+        Возвращает Future или None, если задача ключа ещё выполняется или
+        место в очереди не освободилось за timeout секунд.
+        """
+        with self.lock:
+            if key in self.running:
+                return None
+            self.running.add(key)
+        if not self.slots.acquire(timeout=timeout):
+            with self.lock:
+                self.running.discard(key)
+            return None
+        metrics.POOL_TASKS.set(len(self.running))
+        context = contextvars.copy_context()
+        future = self.executor.submit(context.run, func, *args)
+        future.add_done_callback(lambda _: self.release(key))
+        return future
+
+    def release(self, key):
+        """Освобождает ключ и место в очереди после завершения задачи."""
+        with self.lock:
+            self.running.discard(key)
+            metrics.POOL_TASKS.set(len(self.running))
+        self.slots.release()
+
+    def shutdown(self, cancel=False):
+        """Дожидается завершения задач и останавливает потоки.
+        С cancel=True ещё не начатые задачи отменяются.
+        """
+        self.executor.shutdown(wait=True, cancel_futures=cancel)
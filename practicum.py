@@ -0,0 +1,126 @@
+import threading
+from http import HTTPStatus
+
+from streaming import CHUNK_SIZE, StreamedAnswer
+
+
+class PracticumClient:
+    """Клиент API Практикума с пулом постоянных соединений.
+    requests импортируется и сессия создаётся при первом запросе.
+    """
+
+    def __init__(self, pool_size=10, timeout=10):
+        """Запоминает размер пула и таймаут запросов."""
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.session = None
+
+    def connect(self):
+        """Создаёт сессию с keep-alive и пулом на pool_size соединений."""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def get(self, url, headers, params, stream=False):
+        """Выполняет GET-запрос через общую сессию с таймаутом.
+        Со stream=True тело читается по мере разбора ответа.
+        """
+        if self.session is None:
+            with self.lock:
+                if self.session is None:
+                    self.session = self.connect()
+        return self.session.get(
+            url, headers=headers, params=params, timeout=self.timeout,
+            stream=stream,
+        )
+
+    def close(self):
+        """Закрывает все соединения пула."""
+        if self.session is not None:
+            self.session.close()
+
+
+class CachedAnswer:
+    """Последний ответ API для одного токена."""
+
+    __slots__ = ('from_date', 'etag', 'last_modified', 'data')
+
+    def __init__(self, from_date, etag, last_modified, data):
+        """Запоминает from_date запроса, заголовки валидации и ответ."""
+        self.from_date = from_date
+        self.etag = etag
+        self.last_modified = last_modified
+        self.data = data
+
+
+class ResponseCache:
+    """Кэш последнего ответа API для каждого токена.
+    Курсор сдвигается после каждого опроса, поэтому from_date запросов
+    не повторяется. Ответ на более ранний from_date содержит все записи
+    ответа на более поздний, поэтому заголовки условного запроса
+    отправляются для любого from_date не меньше закэшированного, а при
+    304 отдаётся закэшированный ответ.
+    """
+
+    def __init__(self):
+        """Создаёт пустой кэш."""
+        self.entries = {}
+
+    def lookup(self, token, from_date):
+        """Возвращает запись кэша, покрывающую запрос с from_date.
+        Ответ, разбор которого потоком не дошёл до конца, не используется.
+        """
+        entry = self.entries.get(token)
+        if (entry is not None and entry.from_date <= from_date
+                and getattr(entry.data, 'complete', True)):
+            return entry
+        return None
+
+    def conditional_headers(self, token, from_date):
+        """Возвращает заголовки условного запроса к закэшированному ответу."""
+        entry = self.lookup(token, from_date)
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def remember(self, token, from_date, response, data):
+        """Запоминает ответ и его заголовки валидации."""
+        self.entries[token] = CachedAnswer(
+            from_date,
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            data,
+        )
+        return data
+
+    def parse(self, token, from_date, response):
+        """Возвращает JSON ответа.
+        При 304 отдаёт тот же объект из кэша, не разбирая JSON повторно.
+        """
+        entry = self.lookup(token, from_date)
+        if entry is not None and (
+                response.status_code == HTTPStatus.NOT_MODIFIED):
+            return entry.data
+        return self.remember(token, from_date, response, response.json())
+
+    def stream(self, token, from_date, response, chunk_size=CHUNK_SIZE):
+        """Возвращает StreamedAnswer, разбирающий тело по мере чтения.
+        При 304 отдаётся прошлый ответ, уже прочитанный, с его полями
+        верхнего уровня.
+        """
+        entry = self.lookup(token, from_date)
+        if entry is not None and (
+                response.status_code == HTTPStatus.NOT_MODIFIED):
+            response.close()
+            return entry.data
+        return self.remember(token, from_date, response, StreamedAnswer(
+            response.iter_content(chunk_size), close=response.close))
@@ -0,0 +1,164 @@
+import hashlib
+import heapq
+import itertools
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import exceptions
+
+BACKOFF_ERRORS = (
+    exceptions.NonStatusCodeError,
+    exceptions.WrongStatusCodeError,
+    ConnectionError,
+)
+MIN_GAP = 0.1
+
+
+def phase(value):
+    """Возвращает детерминированную долю интервала в [0, 1) для значения."""
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+def parse_retry_after(value):
+    """Переводит заголовок Retry-After в количество секунд."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = datetime.now(timezone.utc)
+    return max((retry_date - now).total_seconds(), 0)
+
+
+class PollScheduler:
+    """Планирует следующий опрос каждой подписки.
+    Пока работа на проверке, опрашивает чаще; при сбоях API увеличивает
+    паузу экспоненциально с разбросом. Опросы привязаны к слотам: у
+    каждого токена свой сдвиг внутри интервала, отсчитанный от эпохи Unix,
+    поэтому опросы равномерно распределены по интервалу и после
+    перезапуска попадают в те же слоты. Ближайшие опросы берутся из кучи.
+    """
+
+    def __init__(self, retry_time, reviewing_time, backoff_base, backoff_max):
+        """Задаёт обычный, ускоренный и максимальный интервалы опроса."""
+        self.retry_time = retry_time
+        self.reviewing_time = reviewing_time
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.counter = itertools.count()
+        self.heap = []
+        self.tracked = None
+        self.size = 0
+
+    def slot_delay(self, subscription, interval, min_gap=MIN_GAP):
+        """Возвращает паузу до ближайшего слота подписки с шагом interval.
+        Слот ближе min_gap интервала пропускается, чтобы подписка, только
+        что вставшая в сетку слотов, не опрашивалась дважды подряд.
+        """
+        offset = phase(subscription.token) * interval
+        delay = (offset - time.time()) % interval or interval
+        if delay < interval * min_gap:
+            delay += interval
+        return delay
+
+    def interval(self, subscription):
+        """Возвращает обычный интервал опроса подписки."""
+        if subscription.reviewing:
+            return self.reviewing_time
+        return self.retry_time
+
+    def spread(self, subscriptions):
+        """Назначает первый опрос подписок на их слоты.
+        После запуска подписки опрашиваются не разом, а в течение
+        интервала, в тех же слотах, что и до перезапуска.
+        """
+        for subscription in subscriptions:
+            self.schedule(subscription, self.slot_delay(
+                subscription, self.interval(subscription), min_gap=0))
+
+    def success(self, subscription):
+        """Планирует опрос после успешного ответа API."""
+        subscription.failures = 0
+        self.schedule(subscription, self.slot_delay(
+            subscription, self.interval(subscription)))
+
+    def failure(self, subscription, error):
+        """Планирует повторный опрос после ошибки.
+        Разброс пауз детерминирован: он зависит от токена и числа сбоев,
+        и подписки с общим токеном повторяют запрос вместе.
+        """
+        retry_after = getattr(error, 'retry_after', None)
+        if not isinstance(error, BACKOFF_ERRORS):
+            if retry_after is None:
+                delay = self.slot_delay(subscription, self.retry_time)
+            else:
+                delay = retry_after + (
+                    phase(subscription.token) * self.backoff_base)
+            self.schedule(subscription, delay)
+            return
+        subscription.failures += 1
+        delay = min(
+            self.backoff_base * 2 ** (subscription.failures - 1),
+            self.backoff_max,
+        )
+        jitter = phase(f'{subscription.token}:{subscription.failures}')
+        delay = delay / 2 + jitter * delay / 2
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        self.schedule(subscription, delay)
+
+    def schedule(self, subscription, delay):
+        """Назначает подписке опрос через delay секунд."""
+        subscription.next_poll = time.monotonic() + delay
+        heapq.heappush(
+            self.heap, (subscription.next_poll, next(self.counter),
+                        subscription))
+
+    def invalidate(self):
+        """Отмечает, что список подписок изменился на месте."""
+        self.tracked = None
+
+    def track(self, subscriptions):
+        """Перестраивает кучу, если список подписок сменился."""
+        if subscriptions is self.tracked and len(subscriptions) == self.size:
+            return
+        self.tracked = subscriptions
+        self.size = len(subscriptions)
+        self.heap = [
+            (subscription.next_poll, next(self.counter), subscription)
+            for subscription in subscriptions
+        ]
+        heapq.heapify(self.heap)
+
+    def discard_stale(self):
+        """Убирает с вершины кучи записи о перенесённых опросах."""
+        while self.heap and self.heap[0][0] != self.heap[0][2].next_poll:
+            heapq.heappop(self.heap)
+
+    def due(self, subscriptions):
+        """Возвращает подписки, время опроса которых уже наступило.
+        Подписки снимаются с кучи: каждую нужно опросить или перенести.
+        """
+        self.track(subscriptions)
+        now = time.monotonic()
+        due = []
+        self.discard_stale()
+        while self.heap and self.heap[0][0] <= now:
+            due.append(heapq.heappop(self.heap)[2])
+            self.discard_stale()
+        return due
+
+    def time_to_next(self, subscriptions):
+        """Возвращает паузу до ближайшего запланированного опроса."""
+        self.track(subscriptions)
+        self.discard_stale()
+        if not self.heap:
+            return self.retry_time
+        return max(self.heap[0][0] - time.monotonic(), 0)
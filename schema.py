@@ -0,0 +1,102 @@
+import enum
+from datetime import datetime, timezone
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+class StatusEnum(str, enum.Enum):
+    """Статус проверки; член перечисления равен своему строковому значению."""
+
+    __str__ = str.__str__
+    __format__ = str.__format__
+
+
+def make_status_enum(statuses):
+    """Создаёт перечисление статусов с членами по ключам statuses."""
+    return StatusEnum('Status', [(status, status) for status in statuses])
+
+
+def date_timestamp(value):
+    """Переводит date_updated из ответа API в Unix-время или None."""
+    if value is None:
+        return None
+    try:
+        date = datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        return None
+    return date.replace(tzinfo=timezone.utc).timestamp()
+
+
+class Homework:
+    """Проверенная запись о домашней работе из ответа API."""
+
+    __slots__ = ('id', 'homework_name', 'status', 'date_updated', 'key')
+
+    def __init__(self, id, homework_name, status, date_updated=None):
+        """Создаёт запись из уже проверенных значений.
+        key - ключ работы в индексе статусов: id, а без него - название.
+        """
+        self.id = id
+        self.homework_name = homework_name
+        self.status = status
+        self.date_updated = date_updated
+        self.key = str(homework_name if id is None else id)
+
+
+class HomeworkSchema:
+    """Схема записи о домашней работе.
+    Проверки полей собираются один раз при создании схемы, а каждая
+    запись проверяется за один проход по ним.
+    """
+
+    def __init__(self, statuses):
+        """Компилирует проверки полей для перечисления статусов statuses.
+        Статусы в результате заменяются членами перечисления.
+        """
+        lookup = {member.value: member for member in statuses}
+        self.fields = (
+            ('id', False, lambda value: isinstance(value, int), None,
+             'id не является целым числом'),
+            ('homework_name', True, lambda value: isinstance(value, str),
+             None, 'homework_name не является строкой'),
+            ('status', True, lambda value: value in lookup, lookup.get,
+             'status отсутствует в словаре VERDICTS'),
+            ('date_updated', False, lambda value: isinstance(value, str),
+             None, 'date_updated не является строкой'),
+        )
+
+    def check(self, raw, number=0):
+        """Проверяет запись номер number и возвращает (работа, ошибка).
+        Для некорректной записи работа - None, ошибка перечисляет все
+        найденные в ней проблемы.
+        """
+        if not isinstance(raw, dict):
+            return None, f'homeworks[{number}]: не является словарем'
+        values, problems = [], []
+        for name, required, check, convert, message in self.fields:
+            value = raw.get(name)
+            if value is None:
+                if required:
+                    problems.append(f'{name} отсутствует')
+            elif not check(value):
+                problems.append(message)
+            elif convert:
+                value = convert(value)
+            values.append(value)
+        if problems:
+            return None, f'homeworks[{number}]: {", ".join(problems)}'
+        return Homework(*values), None
+
+    def validate(self, homeworks):
+        """Проверяет все записи и возвращает (работы, ошибки).
+        Некорректные записи не попадают в результат, а все найденные в них
+        ошибки возвращаются списком.
+        """
+        valid, errors = [], []
+        for number, raw in enumerate(homeworks):
+            homework, error = self.check(raw, number)
+            if error:
+                errors.append(error)
+            else:
+                valid.append(homework)
+        return valid, errors
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+
+class StateStore:
+    """Хранилище состояния подписок в памяти процесса.
+    Ничего не сохраняет между перезапусками, наследники - сохраняют.
+    """
+
+    def load(self, subscription):
+        """Восстанавливает метку времени и статусы подписки."""
+        pass
+
+    def save(self, subscription):
+        """Запоминает текущее состояние подписки."""
+        pass
+
+    def refresh(self):
+        """Перечитывает состояние, записанное другими процессами."""
+        pass
+
+    def flush(self):
+        """Записывает накопленные изменения на диск."""
+        pass
+
+    def close(self):
+        """Сохраняет изменения и освобождает ресурсы хранилища."""
+        self.flush()
+
+
+def restore(subscription, timestamp, statuses):
+    """Применяет сохранённое состояние к подписке.
+    Строки статусов интернируются, чтобы тысячи подписок делили их копии.
+    """
+    subscription.timestamp = max(subscription.timestamp, timestamp)
+    subscription.statuses.update(
+        (key, sys.intern(status)) for key, status in statuses.items())
+    subscription.reviewing = 'reviewing' in subscription.statuses.values()
+
+
+class JSONStateStore(StateStore):
+    """Хранилище состояния в JSON-файле с атомарной записью.
+    Несколько процессов могут делить файл: запись идёт под общей
+    блокировкой и сливает изменения процесса с тем, что уже на диске.
+    """
+
+    def __init__(self, path):
+        """Читает ранее сохранённое состояние из файла path."""
+        self.path = path
+        self.dirty = set()
+        self.data = self.read()
+
+    def read(self):
+        """Возвращает состояние из файла или пустой словарь."""
+        try:
+            with open(self.path, encoding='UTF-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def lock(self):
+        """Открывает файл блокировки и захватывает его, если умеет ОС."""
+        digest = hashlib.sha256(
+            os.path.abspath(self.path).encode()).hexdigest()[:16]
+        lock_file = open(os.path.join(
+            tempfile.gettempdir(), f'homework_bot-{digest}.lock'), 'a')
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def load(self, subscription):
+        """Восстанавливает метку времени и статусы подписки."""
+        state = self.data.get(subscription.key)
+        if state:
+            restore(subscription, state['timestamp'], state['statuses'])
+
+    def save(self, subscription):
+        """Запоминает текущее состояние подписки."""
+        state = {
+            'timestamp': subscription.saved_timestamp,
+            'statuses': dict(subscription.statuses),
+        }
+        if self.data.get(subscription.key) != state:
+            self.data[subscription.key] = state
+            self.dirty.add(subscription.key)
+
+    def refresh(self):
+        """Перечитывает файл, не теряя ещё не записанных изменений."""
+        with self.lock():
+            data = self.read()
+        data.update((key, self.data[key]) for key in self.dirty)
+        self.data = data
+
+    def flush(self):
+        """Перезаписывает файл через временный файл и os.replace."""
+        if not self.dirty:
+            return
+        with self.lock():
+            data = self.read()
+            data.update((key, self.data[key]) for key in self.dirty)
+            self.write(data)
+        self.data = data
+        self.dirty.clear()
+
+    def write(self, data):
+        """Атомарно записывает data в файл."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='UTF-8') as file:
+                json.dump(data, file, ensure_ascii=False)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+class SQLiteStateStore(StateStore):
+    """Хранилище состояния в базе SQLite."""
+
+    def __init__(self, path):
+        """Открывает базу path и создаёт таблицу состояния."""
+        import sqlite3
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS subscription_state ('
+            'key TEXT PRIMARY KEY, timestamp INTEGER, statuses TEXT)'
+        )
+        self.connection.commit()
+
+    def load(self, subscription):
+        """Восстанавливает метку времени и статусы подписки."""
+        row = self.connection.execute(
+            'SELECT timestamp, statuses FROM subscription_state '
+            'WHERE key = ?', (subscription.key,)
+        ).fetchone()
+        if row:
+            restore(subscription, row[0], json.loads(row[1]))
+
+    def save(self, subscription):
+        """Запоминает текущее состояние подписки до ближайшего flush."""
+        self.connection.execute(
+            'INSERT OR REPLACE INTO subscription_state '
+            '(key, timestamp, statuses) VALUES (?, ?, ?)',
+            (
+                subscription.key,
+                subscription.saved_timestamp,
+                json.dumps(subscription.statuses, ensure_ascii=False),
+            )
+        )
+
+    def flush(self):
+        """Фиксирует транзакцию с накопленными изменениями."""
+        self.connection.commit()
+
+    def close(self):
+        """Фиксирует изменения и закрывает соединение с базой."""
+        self.flush()
+        self.connection.close()
+
+
+def make_store(path):
+    """Выбирает хранилище по пути к файлу состояния.
+    Файлы .db/.sqlite/.sqlite3 хранятся в SQLite, остальные - в JSON.
+    """
+    if not path:
+        return StateStore()
+    if path.endswith(SQLITE_SUFFIXES):
+        return SQLiteStateStore(path)
+    return JSONStateStore(path)
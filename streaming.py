@@ -0,0 +1,150 @@
+import codecs
+import json
+
+CHUNK_SIZE = 65536
+WHITESPACE = ' \t\n\r'
+STREAMED = object()
+
+
+class JSONStream:
+    """Текст JSON, читаемый кусками, с разбором значений по одному.
+    В памяти держится только ещё не разобранный хвост прочитанного.
+    """
+
+    def __init__(self, chunks):
+        """Готовит разбор байтовых кусков chunks в кодировке UTF-8."""
+        self.chunks = iter(chunks)
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def fill(self):
+        """Дочитывает следующий кусок; False, если данные кончились."""
+        if self.eof:
+            return False
+        self.buffer = self.buffer[self.position:]
+        self.position = 0
+        for chunk in self.chunks:
+            text = self.text.decode(chunk)
+            if text:
+                self.buffer += text
+                return True
+        self.buffer += self.text.decode(b'', final=True)
+        self.eof = True
+        return False
+
+    def error(self, message):
+        """Возвращает ошибку разбора в текущей позиции."""
+        return json.JSONDecodeError(message, self.buffer, self.position)
+
+    def peek(self):
+        """Пропускает пробелы и возвращает следующий символ или ''."""
+        while True:
+            while (self.position < len(self.buffer)
+                   and self.buffer[self.position] in WHITESPACE):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill() and self.position >= len(self.buffer):
+                return ''
+
+    def expect(self, chars):
+        """Читает один из символов chars и возвращает его."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise self.error(f'Ожидался один из символов {chars}')
+        self.position += 1
+        return char
+
+    def value(self):
+        """Разбирает следующее значение целиком.
+        Значение в конце буфера принимается только в конце данных: иначе
+        число или литерал могли бы продолжиться в следующем куске.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(
+                    self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            if end < len(self.buffer) or not self.fill():
+                self.position = end
+                return value
+
+    def finish(self):
+        """Проверяет, что после разобранного значения нет данных."""
+        if self.peek():
+            raise self.error('Лишние данные после JSON')
+
+
+class StreamedAnswer:
+    """Ответ API, массив которого разбирается по одной записи.
+    Остальные поля верхнего уровня доступны через get после прохода по
+    records. Вместо массива в fields хранится метка STREAMED.
+    """
+
+    def __init__(self, chunks, key='homeworks', close=None):
+        """Готовит разбор кусков chunks; close вызывается после разбора."""
+        self.stream = JSONStream(chunks)
+        self.key = key
+        self.close = close
+        self.fields = {}
+        self.consumed = False
+        self.complete = False
+
+    def get(self, name, default=None):
+        """Возвращает поле верхнего уровня, как dict.get."""
+        return self.fields.get(name, default)
+
+    def records(self):
+        """Отдаёт записи массива key по одной и дочитывает ответ.
+        Повторный проход ничего не отдаёт: тело уже прочитано.
+        """
+        if self.consumed:
+            return
+        self.consumed = True
+        stream = self.stream
+        try:
+            if stream.peek() != '{':
+                stream.value()
+                raise TypeError('Ответ API не является словарем')
+            stream.expect('{')
+            if stream.peek() == '}':
+                stream.expect('}')
+                stream.finish()
+                self.complete = True
+                return
+            while True:
+                name = stream.value()
+                if not isinstance(name, str):
+                    raise stream.error('Ключ объекта не является строкой')
+                stream.expect(':')
+                if name == self.key and stream.peek() == '[':
+                    self.fields[name] = STREAMED
+                    yield from self.array()
+                else:
+                    self.fields[name] = stream.value()
+                if stream.expect(',}') == '}':
+                    break
+            stream.finish()
+            self.complete = True
+        finally:
+            self.stream = None
+            if self.close is not None:
+                self.close()
+
+    def array(self):
+        """Отдаёт элементы массива по одному."""
+        self.stream.expect('[')
+        if self.stream.peek() == ']':
+            self.stream.expect(']')
+            return
+        while True:
+            yield self.stream.value()
+            if self.stream.expect(',]') == ']':
+                return
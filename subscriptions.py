@@ -0,0 +1,153 @@
+import hashlib
+import json
+
+import exceptions
+
+HISTORY_SIZE = 20
+
+
+class Subscription:
+    """Подписка чата на статусы домашних работ по токену Практикума.
+    Подписок в процессе тысячи, поэтому атрибуты хранятся в __slots__,
+    а история уведомлений - короткий список, созданный при первой доставке.
+    """
+
+    __slots__ = (
+        'token', 'chat_id', 'key', 'timestamp', 'statuses', 'names',
+        'history', 'paused', 'pending', 'pending_date', 'seen',
+        'templates', 'last_error', 'last_response', 'reviewing', 'failures',
+        'next_poll',
+    )
+
+    def __init__(self, token, chat_id, timestamp=0, templates=None):
+        """Создаёт подписку с начальной меткой времени from_date.
+        templates - шаблоны уведомлений, None - шаблоны по умолчанию.
+        """
+        self.token = token
+        self.chat_id = chat_id
+        digest = hashlib.sha256(str(token).encode()).hexdigest()[:16]
+        self.key = f'{digest}:{chat_id}'
+        self.timestamp = timestamp
+        self.statuses = {}
+        self.names = {}
+        self.history = None
+        self.paused = False
+        self.pending = {}
+        self.pending_date = timestamp
+        self.seen = None
+        self.templates = templates
+        self.last_error = None
+        self.last_response = None
+        self.reviewing = False
+        self.failures = 0
+        self.next_poll = 0
+
+    def expect(self, changes, current_date):
+        """Запоминает изменения, ожидающие доставки, и сдвигает курсор.
+        Курсор сдвигается на current_date после каждого успешного опроса,
+        а недоставленные изменения остаются в pending до доставки.
+        pending_date - курсор до самого раннего из них.
+        """
+        if changes and not self.pending:
+            self.pending_date = self.timestamp
+        self.pending.update((key, status) for key, status, _ in changes)
+        self.timestamp = max(self.timestamp, current_date)
+
+    @property
+    def saved_timestamp(self):
+        """Курсор для сохранения в хранилище.
+        После перезапуска недоставленные изменения должны снова попасть
+        в ответ API, поэтому при них сохраняется pending_date.
+        """
+        return self.pending_date if self.pending else self.timestamp
+
+    def confirm(self, key):
+        """Отмечает доставку сообщения об изменении статуса работы key.
+        В историю попадает пара (ключ работы, статус), а не текст сообщения.
+        """
+        status = self.pending.pop(key, None)
+        if status is None:
+            return
+        self.statuses[key] = status
+        if self.history is None:
+            self.history = []
+        self.history.append((key, status))
+        if len(self.history) > HISTORY_SIZE:
+            del self.history[0]
+
+
+def load_subscriptions(path=None, token=None, chat_id=None, catalog=None):
+    """Загружает реестр подписок из JSON-файла.
+    Без файла возвращает единственную подписку из переменных окружения.
+    Поля locale и templates записи выбирают шаблоны из каталога catalog.
+    """
+    if not path:
+        return [Subscription(token, chat_id)]
+    try:
+        with open(path, encoding='UTF-8') as file:
+            records = json.load(file)
+    except (OSError, json.decoder.JSONDecodeError) as error:
+        raise exceptions.WrongSubscriptionError(
+            f'Не удалось прочитать реестр подписок {path}: {error}'
+        )
+    if not isinstance(records, list):
+        raise exceptions.WrongSubscriptionError(
+            f'Реестр подписок {path} не является списком'
+        )
+    subscriptions = []
+    for number, record in enumerate(records):
+        if (not isinstance(record, dict)
+                or not record.get('practicum_token')
+                or not record.get('chat_id')):
+            raise exceptions.WrongSubscriptionError(
+                f'В подписке №{number} не указан токен или чат ID'
+            )
+        templates = None
+        if catalog is not None:
+            try:
+                templates = catalog.get(
+                    record.get('locale'), record.get('templates'))
+            except (TypeError, ValueError) as error:
+                raise exceptions.WrongSubscriptionError(
+                    f'В подписке №{number} неверные шаблоны: {error}'
+                )
+        subscriptions.append(Subscription(
+            record['practicum_token'],
+            record['chat_id'],
+            record.get('from_date', 0),
+            templates,
+        ))
+    return subscriptions
+
+
+def merge_subscriptions(current, loaded):
+    """Сливает текущие подписки с заново загруженным реестром.
+    Подписка с тем же ключом сохраняет объект и состояние, у неё
+    обновляются только шаблоны. Если у чата сменился токен, прежняя
+    подписка чата получает новый токен и не начинает историю заново.
+    Возвращает (подписки, новые подписки, удалённые подписки).
+    """
+    remaining = {subscription.key: subscription for subscription in current}
+    kept = {
+        index: remaining.pop(subscription.key)
+        for index, subscription in enumerate(loaded)
+        if subscription.key in remaining
+    }
+    by_chat = {}
+    for subscription in remaining.values():
+        by_chat.setdefault(subscription.chat_id, []).append(subscription)
+    merged, added = [], []
+    for index, subscription in enumerate(loaded):
+        previous = kept.get(index)
+        if previous is None and by_chat.get(subscription.chat_id):
+            previous = by_chat[subscription.chat_id].pop(0)
+            del remaining[previous.key]
+            previous.token = subscription.token
+            previous.key = subscription.key
+        if previous is None:
+            merged.append(subscription)
+            added.append(subscription)
+            continue
+        previous.templates = subscription.templates
+        merged.append(previous)
+    return merged, added, list(remaining.values())
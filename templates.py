@@ -0,0 +1,83 @@
+import functools
+
+CACHE_SIZE = 1024
+MARKER = '\0'
+
+LOCALES = {
+    'en': (
+        'Homework "{homework_name}" status changed. {verdict}',
+        {
+            'approved': 'Reviewed: the reviewer liked everything. Hooray!',
+            'reviewing': 'The reviewer has taken the homework for review.',
+            'rejected': 'Reviewed: the reviewer has some remarks.',
+        },
+    ),
+}
+
+
+class MessageTemplates:
+    """Шаблоны уведомлений об изменении статуса.
+    Для каждого статуса шаблон заранее разбивается на текст до и после
+    названия работы, а готовые сообщения хранятся в LRU-кэше по паре
+    (название работы, статус).
+    """
+
+    def __init__(self, message_format, verdicts, cache_size=CACHE_SIZE):
+        """Компилирует message_format с полями homework_name и verdict."""
+        self.parts = {}
+        for status, verdict in verdicts.items():
+            try:
+                text = message_format.format(
+                    homework_name=MARKER, verdict=verdict)
+            except (KeyError, IndexError) as error:
+                raise ValueError(f'Неизвестное поле шаблона {error}')
+            if text.count(MARKER) != 1:
+                raise ValueError(
+                    'Шаблон должен содержать {homework_name} один раз')
+            self.parts[status] = tuple(text.split(MARKER))
+        self.render = functools.lru_cache(maxsize=cache_size)(self.build)
+
+    def build(self, homework_name, status):
+        """Собирает сообщение о статусе status работы homework_name."""
+        before, after = self.parts[status]
+        return before + homework_name + after
+
+
+class TemplateCatalog:
+    """Шаблоны по умолчанию, локали и переопределения подписок.
+    Подписки с одинаковыми настройками делят один экземпляр шаблонов
+    вместе с его кэшем.
+    """
+
+    def __init__(self, message_format, verdicts, locales=None,
+                 cache_size=CACHE_SIZE):
+        """Создаёт каталог с шаблонами по умолчанию и локалями locales."""
+        self.message_format = message_format
+        self.verdicts = verdicts
+        self.locales = LOCALES if locales is None else locales
+        self.cache_size = cache_size
+        self.default = MessageTemplates(message_format, verdicts, cache_size)
+        self.instances = {}
+
+    def get(self, locale=None, overrides=None):
+        """Возвращает шаблоны для локали и переопределений подписки.
+        overrides - словарь со статусами и необязательным ключом message
+        для текста всего уведомления. Без настроек возвращает None: такие
+        подписки пользуются шаблонами по умолчанию.
+        """
+        if not locale and not overrides:
+            return None
+        if locale and locale not in self.locales:
+            raise ValueError(f'Неизвестная локаль {locale}')
+        overrides = dict(overrides or {})
+        unknown = set(overrides) - set(self.verdicts) - {'message'}
+        if unknown:
+            raise ValueError(f'Неизвестные статусы в шаблонах: {unknown}')
+        key = (locale, tuple(sorted(overrides.items())))
+        if key not in self.instances:
+            message_format, verdicts = self.locales.get(
+                locale, (self.message_format, self.verdicts))
+            message_format = overrides.pop('message', message_format)
+            self.instances[key] = MessageTemplates(
+                message_format, {**verdicts, **overrides}, self.cache_size)
+        return self.instances[key]
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+from delivery import DeliveryQueue, RateLimiter
+from subscriptions import Subscription
+
+
+class MockBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class TestAsyncMode:
+
+    def test_polls_overlap(self, monkeypatch):
+        import homework
+
+        def slow_answer(token, current_timestamp):
+            time.sleep(0.2)
+            return {
+                'homeworks': [{'homework_name': token, 'status': 'approved'}],
+                'current_date': 100,
+            }
+
+        monkeypatch.setattr(homework, 'get_tenant_answer', slow_answer)
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+        subscriptions = [Subscription(f'hw{i}', i) for i in range(5)]
+
+        async def poll_all():
+            semaphore = asyncio.Semaphore(5)
+            await asyncio.gather(*(
+                homework.async_poll_subscription(queue, item, semaphore)
+                for item in subscriptions
+            ))
+            await homework.async_send_messages(queue)
+
+        start = time.monotonic()
+        asyncio.run(poll_all())
+        assert time.monotonic() - start < 0.6, (
+            'Проверьте, что запросы к API в асинхронном режиме '
+            'выполняются параллельно'
+        )
+        assert sorted(chat_id for chat_id, _ in bot.sent) == list(range(5))
+        assert all(item.timestamp == 100 for item in subscriptions), (
+            'Проверьте, что после отправки сдвигается метка времени подписки'
+        )
+
+    def test_answer_parsed_off_loop(self, monkeypatch):
+        import homework
+
+        threads = []
+        monkeypatch.setattr(
+            homework, 'get_tenant_answer',
+            lambda token, current_timestamp: {
+                'homeworks': [], 'current_date': 100})
+        monkeypatch.setattr(
+            homework, 'fan_out',
+            lambda *args: threads.append(threading.current_thread()))
+        queue = DeliveryQueue(MockBot(), RateLimiter(1000, 0))
+        asyncio.run(homework.async_poll_subscription(
+            queue, Subscription('hw', 1), asyncio.Semaphore(1)))
+        assert threads and threads[0] is not threading.current_thread(), (
+            'Ответ API должен разбираться вне потока цикла событий'
+        )
+
+    def test_chats_sent_concurrently(self):
+        import homework
+
+        class SlowBot(MockBot):
+
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                time.sleep(0.2)
+                super().send_message(chat_id, text)
+
+        bot = SlowBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+        for chat_id in range(4):
+            queue.put(chat_id, 'сообщение')
+        start = time.monotonic()
+        asyncio.run(homework.async_send_messages(queue))
+        assert time.monotonic() - start < 0.6, (
+            'Сообщения разным чатам должны отправляться параллельно'
+        )
+        assert sorted(chat_id for chat_id, _ in bot.sent) == list(range(4))
@@ -0,0 +1,55 @@
+import pytest
+
+import breaker
+import exceptions
+from breaker import CircuitBreaker
+
+
+def fail():
+    raise ConnectionError('нет соединения')
+
+
+class TestCircuitBreaker:
+
+    def test_opens_and_recovers(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(breaker.time, 'monotonic', lambda: now[0])
+        circuit = CircuitBreaker('test', failure_threshold=2, recovery_time=60)
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                circuit.call(fail)
+        assert circuit.state == breaker.OPEN
+        with pytest.raises(exceptions.CircuitOpenError) as error:
+            circuit.call(lambda: 'ok')
+        assert error.value.retry_after == 60, (
+            'Проверьте, что разомкнутый предохранитель отклоняет вызовы'
+        )
+
+        now[0] += 61
+        circuit.before_call()
+        assert circuit.state == breaker.HALF_OPEN
+        with pytest.raises(exceptions.CircuitOpenError):
+            circuit.before_call()
+        circuit.record_success()
+        assert circuit.state == breaker.CLOSED, (
+            'После успешной пробы предохранитель должен замкнуться'
+        )
+
+    def test_failed_probe_reopens(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(breaker.time, 'monotonic', lambda: now[0])
+        circuit = CircuitBreaker('test', failure_threshold=1, recovery_time=5)
+        with pytest.raises(ConnectionError):
+            circuit.call(fail)
+        now[0] += 6
+        with pytest.raises(ConnectionError):
+            circuit.call(fail)
+        assert circuit.state == breaker.OPEN
+
+    def test_not_failure_errors_ignored(self):
+        circuit = CircuitBreaker(
+            'test', failure_threshold=1,
+            is_failure=lambda error: not isinstance(error, KeyError))
+        with pytest.raises(KeyError):
+            circuit.call(lambda: {}['key'])
+        assert circuit.state == breaker.CLOSED
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+from commands import CommandInterface
+from subscriptions import Subscription
+
+
+class MockUpdate:
+
+    def __init__(self, chat_id):
+        self.answers = []
+        self.effective_chat = SimpleNamespace(id=chat_id)
+        self.effective_message = SimpleNamespace(
+            reply_text=self.answers.append)
+
+
+class TestCommands:
+
+    def make_interface(self):
+        subscription = Subscription('token', '12345')
+        subscription.names['1'] = 'hw1'
+        subscription.pending['1'] = 'reviewing'
+        subscription.confirm('1')
+        return CommandInterface([subscription]), subscription
+
+    def test_status_from_cache(self):
+        interface, _ = self.make_interface()
+        update = MockUpdate(12345)
+        interface.status(update, None)
+        assert update.answers == ['"hw1": на проверке'], (
+            'Проверьте, что /status отвечает из сохранённых статусов'
+        )
+
+    def test_history(self):
+        interface, _ = self.make_interface()
+        update = MockUpdate(12345)
+        interface.history(update, None)
+        assert update.answers == ['"hw1": на проверке']
+
+    def test_pause_and_resume(self):
+        interface, subscription = self.make_interface()
+        interface.pause(MockUpdate(12345), None)
+        assert subscription.paused
+        interface.resume(MockUpdate(12345), None)
+        assert not subscription.paused
+
+    def test_unknown_chat(self):
+        interface, subscription = self.make_interface()
+        update = MockUpdate(1)
+        interface.pause(update, None)
+        assert not subscription.paused
+        assert update.answers == ['Чат не подписан на статусы работ']
+
+    def test_sees_reloaded_subscriptions(self):
+        interface, subscription = self.make_interface()
+        subscriptions = interface.subscriptions
+        added = Subscription('token', 777)
+        subscriptions[:] = [added]
+        interface.pause(MockUpdate(777), None)
+        assert added.paused, (
+            'Команды должны видеть подписки, добавленные перезагрузкой'
+        )
+        update = MockUpdate(12345)
+        interface.pause(update, None)
+        assert not subscription.paused
+        assert update.answers == ['Чат не подписан на статусы работ']
@@ -0,0 +1,157 @@
+import math
+import threading
+import time
+
+import telegram
+
+import delivery
+from delivery import DeliveryQueue, RateLimiter
+
+
+class FloodBot:
+
+    def __init__(self, floods=0):
+        self.floods = floods
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.floods:
+            self.floods -= 1
+            raise telegram.error.RetryAfter(3)
+        self.sent.append((chat_id, text))
+
+
+class TestDeliveryQueue:
+
+    def make_queue(self, bot):
+        return DeliveryQueue(bot, RateLimiter(1000, 0))
+
+    def test_messages_coalesced_per_chat(self):
+        bot = FloodBot()
+        queue = self.make_queue(bot)
+        delivered = []
+        queue.put(1, 'первое', lambda: delivered.append(1))
+        queue.put(2, 'другой чат')
+        queue.put(1, 'второе', lambda: delivered.append(2))
+        queue.drain()
+        assert bot.sent == [(1, 'первое\n\nвторое'), (2, 'другой чат')], (
+            'Проверьте, что сообщения для одного чата склеиваются'
+        )
+        assert delivered == [1, 2]
+        assert not queue.pending
+
+    def test_long_batch_split(self):
+        bot = FloodBot()
+        queue = self.make_queue(bot)
+        for number in range(3):
+            queue.put(1, str(number) * 2000)
+        queue.drain()
+        assert len(bot.sent) == 2, (
+            'Склеенное сообщение не должно превышать лимит Telegram'
+        )
+        assert all(
+            len(text) <= delivery.MESSAGE_LIMIT for _, text in bot.sent)
+
+    def test_retry_after(self, monkeypatch):
+        pauses = []
+        monkeypatch.setattr(delivery.time, 'sleep', pauses.append)
+        bot = FloodBot(floods=1)
+        queue = self.make_queue(bot)
+        queue.put(1, 'сообщение')
+        queue.drain()
+        assert bot.sent == [(1, 'сообщение')], (
+            'Проверьте, что после RetryAfter отправка повторяется'
+        )
+        assert 3 in pauses, (
+            'Проверьте, что выдерживается пауза из ответа RetryAfter'
+        )
+
+    def test_undelivered_not_confirmed(self, monkeypatch):
+        monkeypatch.setattr(delivery.time, 'sleep', lambda delay: None)
+        bot = FloodBot(floods=10)
+        queue = self.make_queue(bot)
+        delivered = []
+        queue.put(1, 'сообщение', lambda: delivered.append(1))
+        queue.drain()
+        assert not delivered and not bot.sent
+
+    def test_stop_interrupts_retry_after(self):
+        from lifecycle import Lifecycle
+
+        stop = Lifecycle()
+        bot = FloodBot(floods=1)
+        queue = self.make_queue(bot)
+        queue.put(1, 'первое')
+        queue.put(2, 'второе')
+        threading.Timer(0.1, stop.set).start()
+        start = time.monotonic()
+        queue.drain(stop=stop)
+        assert time.monotonic() - start < 2, (
+            'Пауза RetryAfter должна прерываться запросом остановки'
+        )
+        assert not bot.sent
+        assert list(queue.pending) == [1, 2], (
+            'Неотправленные сообщения должны остаться в очереди для shutdown'
+        )
+
+    def test_failed_batch_retried_with_backoff(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(delivery.time, 'monotonic', lambda: now[0])
+
+        class FlakyBot(FloodBot):
+
+            def __init__(self, failures):
+                super().__init__()
+                self.failures = failures
+
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                if self.failures:
+                    self.failures -= 1
+                    raise telegram.error.TimedOut()
+                super().send_message(chat_id, text)
+
+        bot = FlakyBot(failures=2)
+        queue = self.make_queue(bot)
+        delivered = []
+        queue.put(1, 'сообщение', lambda: delivered.append(1))
+        queue.drain()
+        assert queue.time_to_retry() == delivery.RETRY_BASE, (
+            'Недоставленные сообщения должны остаться в очереди с повтором'
+        )
+        queue.put(1, 'сообщение', lambda: delivered.append(2))
+        now[0] += delivery.RETRY_BASE
+        queue.drain()
+        assert queue.time_to_retry() == delivery.RETRY_BASE * 2, (
+            'Пауза перед повтором должна расти после каждого сбоя'
+        )
+        queue.drain()
+        assert not bot.sent
+        now[0] += delivery.RETRY_BASE * 2
+        queue.drain()
+        assert bot.sent == [(1, 'сообщение')], (
+            'Сообщение, поставленное повторно, не должно дублироваться'
+        )
+        assert delivered == [1, 2]
+        assert queue.time_to_retry() == math.inf
+
+    def test_bad_request_keeps_breaker_closed(self):
+        class BadChatBot(FloodBot):
+
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                if chat_id == 1:
+                    raise telegram.error.BadRequest('Chat not found')
+                super().send_message(chat_id, text)
+
+        bot = BadChatBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0), retry_base=0)
+        for _ in range(queue.breaker.failure_threshold + 1):
+            queue.put(1, 'сообщение')
+            queue.drain()
+        assert delivery.is_telegram_outage(telegram.error.TimedOut())
+        assert not delivery.is_telegram_outage(
+            telegram.error.BadRequest('Chat not found'))
+        queue.put(2, 'другой чат')
+        queue.drain()
+        assert bot.sent == [(2, 'другой чат')], (
+            'Ошибка одного чата не должна размыкать предохранитель Telegram'
+        )
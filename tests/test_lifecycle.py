@@ -0,0 +1,241 @@
+import json
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from delivery import DeliveryQueue, RateLimiter
+from lifecycle import Lifecycle
+from storage import StateStore
+from subscriptions import Subscription
+
+
+class MockBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class RecordingStore(StateStore):
+
+    def __init__(self):
+        self.saved = []
+
+    def save(self, subscription):
+        self.saved.append(subscription.key)
+
+
+@pytest.fixture
+def signals():
+    handlers = {
+        signum: signal.getsignal(signum)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)
+    }
+    yield
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+
+class TestLifecycle:
+
+    def test_wait_wakes_on_stop(self):
+        lifecycle = Lifecycle()
+        threading.Timer(0.1, lifecycle.set).start()
+        start = time.monotonic()
+        assert lifecycle.wait(10) is True
+        assert time.monotonic() - start < 2, (
+            'Ожидание следующего опроса должно прерываться остановкой'
+        )
+
+    def test_wait_wakes_on_reload(self):
+        lifecycle = Lifecycle()
+        threading.Timer(0.1, lifecycle.request_reload).start()
+        assert lifecycle.wait(10) is False
+        assert lifecycle.take_reload() is True
+        assert lifecycle.take_reload() is False, (
+            'Запрос перезагрузки должен выполняться один раз'
+        )
+
+    def test_signals(self, signals):
+        lifecycle = Lifecycle().install()
+        os.kill(os.getpid(), signal.SIGHUP)
+        assert lifecycle.take_reload()
+        assert not lifecycle.is_set()
+        os.kill(os.getpid(), signal.SIGTERM)
+        assert lifecycle.is_set()
+
+
+class TestShutdown:
+
+    def test_stop_drains_and_saves(self, monkeypatch):
+        import homework
+
+        stop = Lifecycle()
+
+        def answer(token, current_timestamp):
+            stop.set()
+            return {
+                'homeworks': [{'homework_name': token, 'status': 'approved'}],
+                'current_date': 100,
+            }
+
+        monkeypatch.setattr(homework, 'get_tenant_answer', answer)
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+        subscriptions = [Subscription('first', 1), Subscription('second', 2)]
+        store = RecordingStore()
+        homework.run_polling(queue, subscriptions, store, stop)
+        assert [chat_id for chat_id, _ in bot.sent] == [1], (
+            'После остановки новые подписки не опрашиваются, а накопленные '
+            'сообщения отправляются'
+        )
+        assert subscriptions[0].statuses == {'first': 'approved'}
+        assert set(store.saved) == {item.key for item in subscriptions}, (
+            'При остановке должно сохраняться состояние всех подписок'
+        )
+
+    def test_state_saved_before_drain(self):
+        import homework
+
+        events = []
+
+        class LoggingBot(MockBot):
+
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                events.append('send')
+                super().send_message(chat_id, text, **kwargs)
+
+        class LoggingStore(RecordingStore):
+
+            def save(self, subscription):
+                events.append('save')
+
+        queue = DeliveryQueue(LoggingBot(), RateLimiter(1000, 0))
+        queue.put(1, 'message')
+        homework.shutdown(queue, [Subscription('token', 1)], LoggingStore())
+        assert events[:2] == ['save', 'send'], (
+            'Состояние должно сохраняться до отправки накопленных сообщений'
+        )
+
+    def test_deadline_from_signal(self):
+        import homework
+
+        stop = Lifecycle()
+        stop.set()
+        stop.stopped_at -= homework.SHUTDOWN_TIMEOUT + 1
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+        queue.put(1, 'message')
+        homework.shutdown(queue, [], RecordingStore(), stop)
+        assert not bot.sent, (
+            'Время на отправку должно отсчитываться от запроса остановки'
+        )
+
+    def test_drain_deadline(self):
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+        queue.put(1, 'message')
+        queue.drain(deadline=time.monotonic() - 1)
+        assert not bot.sent
+        assert not queue.pending
+
+
+class TestReload:
+
+    @pytest.fixture
+    def config(self, monkeypatch, tmp_path):
+        import homework
+
+        path = tmp_path / 'subscriptions.json'
+        monkeypatch.setattr(homework, 'ENV_FILES', ())
+        for name in ('PRACTICUM_TOKEN', 'TELEGRAM_CHAT_ID'):
+            monkeypatch.setattr(homework, name, None)
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setattr(homework, 'SUBSCRIPTIONS_FILE', str(path))
+        monkeypatch.setenv('TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setenv('SUBSCRIPTIONS_FILE', str(path))
+        return path
+
+    def test_reload_keeps_state(self, config):
+        import homework
+
+        config.write_text(json.dumps([
+            {'practicum_token': 'kept', 'chat_id': 1, 'locale': 'en'},
+            {'practicum_token': 'added', 'chat_id': 2},
+        ]))
+        kept = Subscription('kept', 1, timestamp=100)
+        kept.statuses['1'] = 'approved'
+        removed = Subscription('removed', 3)
+        subscriptions = [kept, removed]
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+
+        result = homework.reload_config(queue, subscriptions, StateStore())
+        assert result == [removed]
+        assert [item.chat_id for item in subscriptions] == [1, 2]
+        assert subscriptions[0] is kept, (
+            'Подписки, оставшиеся в реестре, должны сохранять состояние'
+        )
+        assert kept.statuses == {'1': 'approved'}
+        assert kept.templates is homework.template_catalog.get('en')
+        assert queue.bot is bot, (
+            'Без смены токена бот не должен пересоздаваться'
+        )
+
+    def test_reload_rotated_token(self, config):
+        import homework
+
+        config.write_text(json.dumps([
+            {'practicum_token': 'new', 'chat_id': 1},
+        ]))
+        subscription = Subscription('old', 1, timestamp=100)
+        subscriptions = [subscription]
+        queue = DeliveryQueue(MockBot(), RateLimiter(1000, 0))
+        homework.reload_config(queue, subscriptions, StateStore())
+        assert subscriptions == [subscription], (
+            'При смене токена подписка чата должна сохранять состояние'
+        )
+        assert subscription.token == 'new'
+        assert subscription.key == Subscription('new', 1).key
+
+    def test_reload_restarts_commands(self, config, monkeypatch):
+        import homework
+
+        class MockCommands:
+
+            def __init__(self):
+                self.tokens = []
+
+            def restart(self, token, webhook_url=None, port=8443):
+                self.tokens.append(token)
+
+        commands = MockCommands()
+        monkeypatch.setattr(homework, 'command_interface', commands)
+        config.write_text(json.dumps([{'practicum_token': 'a', 'chat_id': 1}]))
+        queue = DeliveryQueue(MockBot(), RateLimiter(1000, 0))
+        homework.reload_config(queue, [], StateStore())
+        assert commands.tokens == []
+        monkeypatch.setenv('TELEGRAM_TOKEN', '5678:abcdefg')
+        homework.reload_config(queue, [], StateStore())
+        assert commands.tokens == ['5678:abcdefg'], (
+            'При смене токена бота обработка команд должна перезапускаться'
+        )
+
+    def test_reload_broken_file(self, config):
+        import homework
+
+        config.write_text('{broken')
+        subscription = Subscription('kept', 1)
+        subscriptions = [subscription]
+        queue = DeliveryQueue(MockBot(), RateLimiter(1000, 0))
+        assert homework.reload_config(
+            queue, subscriptions, StateStore()) == []
+        assert subscriptions == [subscription], (
+            'При ошибке в реестре должен остаться прежний список подписок'
+        )
+        assert homework.SUBSCRIPTIONS_FILE == str(config)
@@ -0,0 +1,47 @@
+import atexit
+import json
+import logging
+
+import logs
+
+
+class TestLogs:
+
+    def test_file_log_in_log_dir(self, tmp_path):
+        root = logging.getLogger()
+        handlers = list(root.handlers)
+        listener = logs.setup_logging(str(tmp_path / 'logs'))
+        try:
+            logging.getLogger('homework').info('Проверка логирования')
+        finally:
+            listener.stop()
+            atexit.unregister(listener.stop)
+            root.handlers = handlers
+        content = (tmp_path / 'logs' / logs.LOG_FILE).read_text('UTF-8')
+        assert 'Проверка логирования' in content, (
+            'Проверьте, что логи пишутся в файл в каталоге LOG_DIR'
+        )
+
+    def test_json_fields_and_redaction(self, tmp_path):
+        root = logging.getLogger()
+        handlers = list(root.handlers)
+        listener = logs.setup_logging(str(tmp_path), log_format='json')
+        try:
+            logs.bind_log_context(tenant='abc:1', cycle=7)
+            logging.getLogger('homework').info(
+                "Запрос {'Authorization': 'OAuth y0_secret'}",
+                extra={'api_latency': 0.25, 'http_status': 200}
+            )
+        finally:
+            listener.stop()
+            atexit.unregister(listener.stop)
+            root.handlers = handlers
+            logs.log_context.set({})
+        line = (tmp_path / logs.LOG_FILE).read_text('UTF-8').splitlines()[-1]
+        record = json.loads(line)
+        assert record['tenant'] == 'abc:1' and record['cycle'] == 7
+        assert record['api_latency'] == 0.25
+        assert record['http_status'] == 200
+        assert 'y0_secret' not in line, (
+            'Проверьте, что токены в логах скрываются'
+        )
@@ -0,0 +1,58 @@
+import urllib.request
+
+import pytest
+
+import metrics
+
+
+class TestMetrics:
+
+    def test_timed_records_errors(self):
+        @metrics.timed('test_function')
+        def broken(value):
+            raise ValueError(value)
+
+        with pytest.raises(ValueError):
+            broken(1)
+        text = metrics.registry.render()
+        assert (
+            'homework_bot_errors_total'
+            '{error="ValueError",function="test_function"} 1'
+        ) in text, 'Проверьте, что ошибки считаются по классу исключения'
+        assert (
+            'homework_bot_call_seconds_count{function="test_function"} 1'
+        ) in text, 'Проверьте, что длительность вызова попадает в гистограмму'
+
+    def test_http_endpoint(self):
+        metrics.SUBSCRIPTIONS.set(3)
+        server = metrics.serve(0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(
+                    f'http://127.0.0.1:{port}/metrics') as response:
+                body = response.read().decode('UTF-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert 'homework_bot_subscriptions 3' in body
+
+    def test_status_rendering_timed(self):
+        import homework
+        from subscriptions import Subscription
+
+        def count():
+            prefix = 'homework_bot_call_seconds_count{function="parse_status"} '
+            for line in metrics.registry.render().splitlines():
+                if line.startswith(prefix):
+                    return int(float(line[len(prefix):]))
+            return 0
+
+        before = count()
+        homework.collect_changes(Subscription('token', 1), {
+            'homeworks': [{'homework_name': 'hw1', 'status': 'approved'}],
+            'current_date': 100,
+        })
+        assert count() == before + 1, (
+            'Подготовка сообщений о статусах должна попадать в метрику '
+            'parse_status'
+        )
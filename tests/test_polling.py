@@ -0,0 +1,237 @@
+from delivery import DeliveryQueue, RateLimiter
+from subscriptions import Subscription
+
+
+class MockBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append(text)
+
+
+class TestPolling:
+
+    def make_answer(self, *homeworks):
+        return {
+            'homeworks': [
+                {'id': number, 'homework_name': name, 'status': status}
+                for number, name, status in homeworks
+            ],
+            'current_date': 100,
+        }
+
+    def test_every_homework_notified(self, monkeypatch):
+        import homework
+
+        answers = [
+            self.make_answer(
+                (2, 'hw2', 'reviewing'), (1, 'hw1', 'approved')),
+            self.make_answer(
+                (2, 'hw2', 'reviewing'), (1, 'hw1', 'approved')),
+            self.make_answer(
+                (2, 'hw2', 'rejected'), (1, 'hw1', 'approved')),
+        ]
+        monkeypatch.setattr(
+            homework, 'get_tenant_answer', lambda *args: answers.pop(0))
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+        subscription = Subscription('token', 1, timestamp=50)
+
+        homework.poll_subscription(queue, subscription)
+        queue.drain()
+        assert len(bot.sent) == 1, (
+            'Проверьте, что изменения для одного чата отправляются '
+            'одним сообщением'
+        )
+        bot.sent = bot.sent[0].split('\n\n')
+        assert len(bot.sent) == 2, (
+            'Проверьте, что отправляется сообщение о каждой изменившейся '
+            'домашней работе из ответа API'
+        )
+        assert '"hw1"' in bot.sent[0] and '"hw2"' in bot.sent[1], (
+            'Сообщения должны отправляться от старых работ к новым'
+        )
+        assert subscription.reviewing
+        assert subscription.timestamp == 100
+
+        homework.poll_subscription(queue, subscription)
+        queue.drain()
+        assert len(bot.sent) == 2, (
+            'Проверьте, что о неизменившихся статусах повторно '
+            'не сообщается'
+        )
+
+        homework.poll_subscription(queue, subscription)
+        queue.drain()
+        assert len(bot.sent) == 3
+        assert bot.sent[2].endswith(homework.VERDICTS['rejected'])
+        assert not subscription.reviewing
+
+    def test_first_poll_skips_history(self, monkeypatch):
+        import homework
+
+        answer = self.make_answer(*(
+            (number, f'hw{number}', 'approved') for number in range(30, 0, -1)
+        ))
+        monkeypatch.setattr(homework, 'get_tenant_answer', lambda *args: answer)
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+        subscription = Subscription('token', 1)
+
+        homework.poll_subscription(queue, subscription)
+        queue.drain()
+        assert len(bot.sent) == 1 and '"hw30"' in bot.sent[0], (
+            'На первом опросе сообщается только о самой новой работе'
+        )
+        assert '\n\n' not in bot.sent[0]
+        assert len(subscription.statuses) == 30, (
+            'Статусы остальных работ запоминаются без уведомлений'
+        )
+
+    def test_cursor_advances_on_every_poll(self, monkeypatch):
+        import homework
+
+        requested = []
+        answers = [
+            self.make_answer((1, 'hw1', 'approved')),
+            {'homeworks': [], 'current_date': 200},
+        ]
+
+        def get_answer(token, from_date):
+            requested.append(from_date)
+            return answers.pop(0)
+
+        monkeypatch.setattr(homework, 'get_tenant_answer', get_answer)
+        monkeypatch.setattr(homework, 'CURSOR_OVERLAP', 30)
+        subscription = Subscription('token', 1)
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+
+        homework.poll_subscription(queue, subscription)
+        queue.pending.clear()
+        assert subscription.timestamp == 100, (
+            'Курсор должен сдвигаться после каждого успешного опроса'
+        )
+        assert not subscription.statuses
+        assert subscription.saved_timestamp == 0, (
+            'Пока изменение не доставлено, сохраняться должен старый курсор'
+        )
+
+        homework.poll_subscription(queue, subscription)
+        queue.drain()
+        assert requested == [0, 70], (
+            'from_date должен отставать от курсора на окно перекрытия'
+        )
+        assert len(bot.sent) == 1 and '"hw1"' in bot.sent[0], (
+            'Недоставленное изменение должно отправляться повторно'
+        )
+        assert subscription.statuses == {'1': 'approved'}
+        assert subscription.saved_timestamp == 200
+
+    def test_overlap_window_dedupe(self, monkeypatch):
+        import homework
+
+        def record(status, date_updated):
+            return {
+                'id': 1, 'homework_name': 'hw1', 'status': status,
+                'date_updated': date_updated,
+            }
+
+        answers = [
+            {'homeworks': [record('rejected', '2020-02-13T14:40:57Z')],
+             'current_date': 1581605000},
+            {'homeworks': [record('rejected', '2020-02-13T14:40:57Z')],
+             'current_date': 1581605060},
+            {'homeworks': [record('rejected', '2020-02-13T14:45:00Z')],
+             'current_date': 1581605400},
+        ]
+        monkeypatch.setattr(
+            homework, 'get_tenant_answer', lambda *args: answers.pop(0))
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+        subscription = Subscription('token', 1)
+
+        for _ in range(3):
+            homework.poll_subscription(queue, subscription)
+            queue.drain()
+        assert len(bot.sent) == 2, (
+            'Запись из окна перекрытия не должна приводить к повторному '
+            'уведомлению, а новая проверка с тем же статусом - должна'
+        )
+
+    def test_shared_token_single_request(self, monkeypatch):
+        import homework
+
+        requested = []
+
+        def get_answer(token, from_date):
+            requested.append((token, from_date))
+            return {
+                'homeworks': [
+                    {'id': 2, 'homework_name': 'hw2', 'status': 'approved',
+                     'date_updated': '2020-02-13T14:45:00Z'},
+                    {'id': 1, 'homework_name': 'hw1', 'status': 'approved',
+                     'date_updated': '2020-02-13T14:40:57Z'},
+                ],
+                'current_date': 1581605400,
+            }
+
+        monkeypatch.setattr(homework, 'get_tenant_answer', get_answer)
+        monkeypatch.setattr(homework, 'CURSOR_OVERLAP', 0)
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+        subscriptions = [
+            Subscription('shared', 1),
+            Subscription('shared', 2, timestamp=1581605000),
+            Subscription('other', 3),
+        ]
+
+        homework.poll_cycle(queue, subscriptions, homework.make_store(None), 1)
+        assert sorted(requested) == [('other', 0), ('shared', 0)], (
+            'Подписки с общим токеном должны делить один запрос к API'
+        )
+        assert len(bot.sent) == 3, (
+            'Ответ общего запроса должен доходить до каждого чата'
+        )
+        assert subscriptions[1].statuses == {'2': 'approved'}, (
+            'Подписка с более поздним курсором не должна получать записи '
+            'старше своего from_date'
+        )
+        assert all(item.timestamp == 1581605400 for item in subscriptions)
+
+    def test_shared_token_error(self, monkeypatch):
+        import exceptions
+        import homework
+
+        def get_answer(token, from_date):
+            raise exceptions.WrongStatusCodeError('API недоступен')
+
+        monkeypatch.setattr(homework, 'get_tenant_answer', get_answer)
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+        subscriptions = [Subscription('shared', 1), Subscription('shared', 2)]
+
+        homework.poll_group(queue, subscriptions)
+        queue.drain()
+        assert len(bot.sent) == 2, (
+            'Ошибка общего запроса должна сообщаться в каждый чат'
+        )
+        assert all(item.failures == 1 for item in subscriptions)
+
+    def test_schema_error_reported_once(self, monkeypatch):
+        import homework
+
+        monkeypatch.setattr(
+            homework, 'get_tenant_answer',
+            lambda *args: self.make_answer((1, 'hw1', 'weird')))
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+        subscription = Subscription('token', 1)
+        for _ in range(2):
+            homework.poll_subscription(queue, subscription)
+            queue.drain()
+        assert len(bot.sent) == 1 and 'homeworks[0]' in bot.sent[0], (
+            'Повторная ошибка схемы не должна отправляться в чат заново'
+        )
@@ -0,0 +1,96 @@
+import threading
+import time
+
+from delivery import DeliveryQueue, RateLimiter
+from lifecycle import Lifecycle
+from pool import TenantPool
+from subscriptions import Subscription
+
+
+class MockBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class TestTenantPool:
+
+    def test_no_overlap_per_key(self):
+        pool = TenantPool(4, 10)
+        release = threading.Event()
+        first = pool.submit('tenant', release.wait, 1)
+        assert first is not None
+        assert pool.submit('tenant', time.sleep, 0) is None, (
+            'Пока опрос подписки не завершён, новый не должен начинаться'
+        )
+        assert pool.submit('other', time.sleep, 0) is not None
+        release.set()
+        first.result()
+        pool.shutdown()
+        assert not pool.busy('tenant')
+
+    def test_backpressure(self):
+        pool = TenantPool(1, 2)
+        release = threading.Event()
+        pool.submit('a', release.wait, 1)
+        pool.submit('b', release.wait, 1)
+        start = time.monotonic()
+        assert pool.submit('c', time.sleep, 0, timeout=0.1) is None, (
+            'При заполненной очереди задача не должна приниматься'
+        )
+        assert time.monotonic() - start >= 0.1
+        release.set()
+        assert pool.submit('c', time.sleep, 0, timeout=1) is not None, (
+            'После освобождения места задача должна приниматься'
+        )
+        pool.shutdown()
+
+    def test_threaded_mode(self, monkeypatch):
+        import homework
+
+        def slow_answer(token, current_timestamp):
+            time.sleep(0.2)
+            return {
+                'homeworks': [{'homework_name': token, 'status': 'approved'}],
+                'current_date': 100,
+            }
+
+        monkeypatch.setattr(homework, 'get_tenant_answer', slow_answer)
+        monkeypatch.setattr(homework, 'CONCURRENCY', 5)
+        bot = MockBot()
+        queue = DeliveryQueue(bot, RateLimiter(1000, 0))
+        subscriptions = [Subscription(f'hw{i}', i) for i in range(5)]
+        stop = Lifecycle()
+        threading.Timer(0.4, stop.set).start()
+
+        start = time.monotonic()
+        homework.run_threaded(
+            queue, subscriptions, homework.make_store(None), stop)
+        assert time.monotonic() - start < 1, (
+            'Проверьте, что в режиме пула потоков запросы к API '
+            'выполняются параллельно'
+        )
+        assert sorted(chat_id for chat_id, _ in bot.sent) == list(range(5))
+        assert all(item.timestamp == 100 for item in subscriptions)
+
+    def test_busy_token_rechecked_soon(self, monkeypatch):
+        import homework
+
+        def slow_answer(token, current_timestamp):
+            time.sleep(0.6)
+            return {'homeworks': [], 'current_date': 100}
+
+        monkeypatch.setattr(homework, 'get_tenant_answer', slow_answer)
+        queue = DeliveryQueue(MockBot(), RateLimiter(1000, 0))
+        first, second = Subscription('shared', 1), Subscription('shared', 2)
+        second.next_poll = time.monotonic() + 0.2
+        stop = Lifecycle()
+        threading.Timer(0.4, stop.set).start()
+        homework.run_threaded(
+            queue, [first, second], homework.make_store(None), stop)
+        assert second.next_poll - time.monotonic() < 2, (
+            'Группа, не принятая пулом, должна проверяться снова вскоре'
+        )
@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+from practicum import ResponseCache
+
+
+class FakeResponse:
+
+    def __init__(self, body, status_code=HTTPStatus.OK, headers=None):
+        self.content = body
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.parsed = 0
+
+    def json(self):
+        self.parsed += 1
+        return {'homeworks': [], 'current_date': 1}
+
+
+class TestResponseCache:
+
+    def test_conditional_headers(self):
+        cache = ResponseCache()
+        assert cache.conditional_headers('token', 0) == {}
+        cache.parse('token', 100, FakeResponse(b'{}', headers={
+            'ETag': '"v1"', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT',
+        }))
+        headers = {
+            'If-None-Match': '"v1"',
+            'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT',
+        }
+        assert cache.conditional_headers('token', 100) == headers
+        assert cache.conditional_headers('token', 200) == headers, (
+            'Курсор сдвигается после каждого опроса: ответ на более ранний '
+            'from_date должен использоваться и для более позднего'
+        )
+        assert cache.conditional_headers('token', 0) == {}, (
+            'Ответ на более поздний from_date не покрывает более ранний'
+        )
+
+    def test_not_modified(self):
+        cache = ResponseCache()
+        data = cache.parse('token', 0, FakeResponse(b'{}'))
+        not_modified = FakeResponse(b'', HTTPStatus.NOT_MODIFIED)
+        assert cache.parse('token', 100, not_modified) is data
+        assert not_modified.parsed == 0
+        changed = FakeResponse(b'{"homeworks": []}')
+        assert cache.parse('token', 100, changed) is not data
+        assert changed.parsed == 1
+
+    def test_polls_send_validators(self, monkeypatch):
+        import homework
+
+        sent = []
+
+        class Client:
+
+            def get(self, url, headers, params, stream=False):
+                sent.append(headers.get('If-None-Match'))
+                status = HTTPStatus.NOT_MODIFIED if sent[1:] else HTTPStatus.OK
+                return FakeResponse(
+                    b'{}', status, headers={'ETag': '"v1"'})
+
+        monkeypatch.setattr(homework, 'api_client', Client())
+        monkeypatch.setattr(homework, 'response_cache', ResponseCache())
+        monkeypatch.setattr(homework, 'STREAMING', False)
+        first = homework.request_answer('token', 0)
+        for from_date in (1540, 2140):
+            assert homework.request_answer('token', from_date) is first
+        assert sent == [None, '"v1"', '"v1"'], (
+            'Условные запросы должны отправляться при сдвинутом курсоре'
+        )
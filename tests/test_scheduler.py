@@ -0,0 +1,97 @@
+import time
+
+import exceptions
+from scheduler import MIN_GAP, PollScheduler, parse_retry_after
+from subscriptions import Subscription
+
+
+class TestPollScheduler:
+
+    def make_scheduler(self):
+        return PollScheduler(600, 60, 30, 3600)
+
+    def delay(self, subscription):
+        return subscription.next_poll - time.monotonic()
+
+    def test_reviewing_polls_faster(self):
+        scheduler = self.make_scheduler()
+        subscription = Subscription('token', 1)
+        scheduler.success(subscription)
+        assert 60 <= self.delay(subscription) <= 660
+        subscription.reviewing = True
+        scheduler.success(subscription)
+        assert self.delay(subscription) <= 60 * (1 + MIN_GAP), (
+            'Пока работа на проверке, опрос должен выполняться чаще'
+        )
+
+    def test_backoff_grows(self):
+        scheduler = self.make_scheduler()
+        subscription = Subscription('token', 1)
+        delays = []
+        for _ in range(4):
+            scheduler.failure(
+                subscription, exceptions.WrongStatusCodeError('ошибка'))
+            delays.append(self.delay(subscription))
+        assert delays[0] <= 30 and delays[3] >= 120, (
+            'Проверьте, что пауза после сбоев растёт экспоненциально'
+        )
+        scheduler.success(subscription)
+        assert subscription.failures == 0
+
+    def test_retry_after(self):
+        scheduler = self.make_scheduler()
+        subscription = Subscription('token', 1)
+        error = exceptions.NonStatusCodeError('429', retry_after=900)
+        scheduler.failure(subscription, error)
+        assert self.delay(subscription) > 890, (
+            'Проверьте, что учитывается заголовок Retry-After'
+        )
+
+    def slot(self, subscription, interval=600):
+        return (time.time() + self.delay(subscription)) % interval
+
+    def test_slots_spread_evenly(self):
+        scheduler = self.make_scheduler()
+        subscriptions = [Subscription(f'token{i}', i) for i in range(600)]
+        scheduler.spread(subscriptions)
+        buckets = [0] * 10
+        for subscription in subscriptions:
+            assert 0 <= self.delay(subscription) <= 600
+            buckets[int(self.slot(subscription) // 60) % 10] += 1
+        assert min(buckets) >= 30 and max(buckets) <= 90, (
+            'Опросы подписок должны равномерно распределяться по интервалу'
+        )
+
+    def test_slots_survive_restart(self):
+        first = Subscription('token', 1)
+        self.make_scheduler().spread([first])
+        second = Subscription('token', 2)
+        self.make_scheduler().success(second)
+        assert abs(self.slot(first) - self.slot(second)) < 1, (
+            'Слот подписки не должен зависеть от перезапуска, а подписки '
+            'с общим токеном должны опрашиваться вместе'
+        )
+
+    def test_due_from_heap(self):
+        scheduler = self.make_scheduler()
+        subscriptions = [Subscription(f'token{i}', i) for i in range(3)]
+        assert scheduler.due(subscriptions) == subscriptions
+        assert scheduler.due(subscriptions) == [], (
+            'Снятая с кучи подписка не должна возвращаться до переноса'
+        )
+        scheduler.schedule(subscriptions[1], 100)
+        scheduler.schedule(subscriptions[2], 0)
+        scheduler.schedule(subscriptions[0], 10)
+        assert scheduler.due(subscriptions) == [subscriptions[2]]
+        assert 9 < scheduler.time_to_next(subscriptions) <= 10
+        scheduler.schedule(subscriptions[0], 0)
+        assert scheduler.due(subscriptions) == [subscriptions[0]], (
+            'Перенесённый опрос должен учитываться по новому времени'
+        )
+        assert 99 < scheduler.time_to_next(subscriptions) <= 100
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after('120') == 120
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+        assert parse_retry_after('garbage') is None
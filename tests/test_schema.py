@@ -0,0 +1,36 @@
+from schema import HomeworkSchema, make_status_enum
+
+
+class TestHomeworkSchema:
+
+    def test_all_problems_reported(self):
+        schema = HomeworkSchema(
+            make_status_enum(['approved', 'reviewing', 'rejected']))
+        homeworks, errors = schema.validate([
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved',
+             'date_updated': '2020-02-13T14:40:57Z'},
+            {'homework_name': 'hw2', 'status': 'unknown'},
+            {'id': 'x', 'status': 'approved'},
+            'not a dict',
+            {'homework_name': 'hw5', 'status': 'rejected'},
+        ])
+        assert [item.key for item in homeworks] == ['1', 'hw5'], (
+            'Проверьте, что корректные записи возвращаются объектами Homework'
+        )
+        assert homeworks[0].date_updated == '2020-02-13T14:40:57Z'
+        assert len(errors) == 3, (
+            'Проверьте, что ошибки всех записей возвращаются вместе'
+        )
+        assert 'id не является целым числом' in errors[1]
+        assert 'homework_name отсутствует' in errors[1]
+
+    def test_slots(self):
+        Status = make_status_enum(['approved'])
+        schema = HomeworkSchema(Status)
+        homeworks, _ = schema.validate(
+            [{'homework_name': 'hw', 'status': 'approved'}])
+        assert not hasattr(homeworks[0], '__dict__')
+        assert homeworks[0].status is Status.approved, (
+            'Статус должен заменяться членом перечисления'
+        )
+        assert homeworks[0].status == 'approved'
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+from os.path import abspath, dirname
+
+root_dir = dirname(dirname(abspath(__file__)))
+
+IMPORT_BUDGET_US = int(os.getenv('IMPORT_BUDGET_US', 150000))
+DEFERRED = (
+    'telegram', 'requests', 'asyncio', 'multiprocessing',
+    'concurrent.futures', 'http.server', 'sqlite3',
+)
+
+
+def import_times(module):
+    """Возвращает {модуль: суммарное время импорта, мкс} по -X importtime."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=root_dir, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup:
+
+    def test_heavy_imports_deferred(self):
+        times = import_times('homework')
+        loaded = [name for name in DEFERRED if name in times]
+        assert not loaded, (
+            'Импорт homework не должен загружать модули, нужные только '
+            f'при работе бота: {loaded}'
+        )
+
+    def test_import_time_budget(self):
+        cumulative = import_times('homework')['homework']
+        assert cumulative <= IMPORT_BUDGET_US, (
+            f'Импорт homework занял {cumulative} мкс, '
+            f'бюджет {IMPORT_BUDGET_US} мкс'
+        )
@@ -0,0 +1,46 @@
+import pytest
+
+from storage import JSONStateStore, SQLiteStateStore, make_store
+from subscriptions import Subscription
+
+
+class TestStateStore:
+
+    @pytest.mark.parametrize('name', ['state.json', 'state.sqlite3'])
+    def test_state_survives_restart(self, tmp_path, name):
+        path = str(tmp_path / name)
+        store = make_store(path)
+        subscription = Subscription('token', 1)
+        subscription.timestamp = 100
+        subscription.statuses['123'] = 'reviewing'
+        store.save(subscription)
+        store.close()
+
+        restarted = Subscription('token', 1)
+        make_store(path).load(restarted)
+        assert restarted.timestamp == 100, (
+            'Проверьте, что после перезапуска метка времени восстанавливается'
+        )
+        assert restarted.statuses == {'123': 'reviewing'}, (
+            'Проверьте, что после перезапуска статусы восстанавливаются'
+        )
+        assert restarted.reviewing
+
+        other = Subscription('token', 2)
+        make_store(path).load(other)
+        assert other.timestamp == 0 and not other.statuses
+
+    def test_backend_by_suffix(self, tmp_path):
+        assert isinstance(
+            make_store(str(tmp_path / 'state.db')), SQLiteStateStore)
+        assert isinstance(
+            make_store(str(tmp_path / 'state.json')), JSONStateStore)
+
+    def test_json_write_is_atomic(self, tmp_path):
+        path = tmp_path / 'state.json'
+        store = JSONStateStore(str(path))
+        store.save(Subscription('token', 1))
+        store.flush()
+        assert [item.name for item in tmp_path.iterdir()] == ['state.json'], (
+            'Временный файл должен заменять файл состояния целиком'
+        )
@@ -0,0 +1,179 @@
+import json
+import tracemalloc
+from http import HTTPStatus
+
+import pytest
+import requests
+
+from breaker import OPEN, CircuitBreaker
+from delivery import DeliveryQueue, RateLimiter
+from practicum import ResponseCache
+from streaming import STREAMED, StreamedAnswer
+from subscriptions import Subscription
+
+ANSWER = {
+    'homeworks': [
+        {'id': 12345, 'homework_name': 'hw1', 'status': 'approved',
+         'reviewer_comment': 'Всё нравится, "ура" ]}',
+         'date_updated': '2020-02-13T14:40:57Z'},
+        {'id': 2, 'homework_name': 'hw2', 'status': 'rejected',
+         'date_updated': '2020-02-13T14:45:00Z', 'score': 1.5e3,
+         'extra': [None, True, False, {}]},
+    ],
+    'current_date': 1581604970,
+}
+
+
+def split(body, size):
+    data = body.encode()
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def history(count, current_date=1581604970):
+    yield b'{"homeworks": ['
+    for number in range(count):
+        if number:
+            yield b','
+        yield json.dumps({
+            'id': number, 'homework_name': f'hw{number}',
+            'status': 'approved', 'reviewer_comment': 'Всё нравится' * 20,
+            'date_updated': '2020-02-13T14:40:57Z',
+        }).encode()
+    yield f'], "current_date": {current_date}}}'.encode()
+
+
+class FakeResponse:
+
+    def __init__(self, chunks, status_code=HTTPStatus.OK, headers=None):
+        self.chunks = chunks
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+
+class TestStreamedAnswer:
+
+    @pytest.mark.parametrize('size', [1, 7, 65536])
+    def test_same_as_json(self, size):
+        closed = []
+        answer = StreamedAnswer(
+            split(json.dumps(ANSWER, ensure_ascii=False, indent=1), size),
+            close=lambda: closed.append(True),
+        )
+        assert list(answer.records()) == ANSWER['homeworks'], (
+            'Записи должны разбираться одинаково при любом разбиении тела'
+        )
+        assert answer.get('current_date') == ANSWER['current_date']
+        assert answer.fields['homeworks'] is STREAMED
+        assert answer.complete and closed
+        assert list(answer.records()) == []
+
+    @pytest.mark.parametrize('body, error', [
+        ('{"homeworks": [{"id": 1}', json.JSONDecodeError),
+        ('{"homeworks": []} []', json.JSONDecodeError),
+        ('', json.JSONDecodeError),
+        ('[{"id": 1}]', TypeError),
+    ])
+    def test_broken_body(self, body, error):
+        answer = StreamedAnswer(split(body, 3))
+        with pytest.raises(error):
+            list(answer.records())
+        assert not answer.complete
+
+    def test_number_across_chunks(self):
+        answer = StreamedAnswer([b'{"homeworks": [], "current_date": 15',
+                                 b'81604970}'])
+        list(answer.records())
+        assert answer.get('current_date') == 1581604970
+
+
+class TestStreamingCollect:
+
+    def test_changes_match_dict(self):
+        import homework
+
+        streamed = Subscription('token', 1)
+        parsed = Subscription('token', 1)
+        body = json.dumps(ANSWER)
+        assert homework.collect_changes(
+            streamed, StreamedAnswer(split(body, 5))
+        ) == homework.collect_changes(parsed, json.loads(body))
+        assert streamed.seen == parsed.seen
+
+    def test_not_a_list(self):
+        import homework
+
+        answer = StreamedAnswer([b'{"homeworks": {}, "current_date": 1}'])
+        with pytest.raises(TypeError):
+            homework.collect_changes(Subscription('token', 1), answer)
+
+    def test_flat_memory(self):
+        import homework
+
+        def peak(count):
+            subscription = Subscription('token', 1, timestamp=1581604970)
+            subscription.statuses = {
+                str(number): 'approved' for number in range(count)}
+            answer = StreamedAnswer(history(count))
+            tracemalloc.start()
+            changes, errors = homework.collect_changes(subscription, answer)
+            _, result = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            assert changes == [] and errors == []
+            return result
+
+        homework.collect_changes(
+            Subscription('token', 1), StreamedAnswer(history(1)))
+        small, large = peak(200), peak(4000)
+        assert large < small * 2, (
+            'Пиковая память потокового разбора не должна расти с длиной '
+            f'истории: {small} Б на 200 работ, {large} Б на 4000'
+        )
+
+    def test_broken_body_opens_breaker(self, monkeypatch):
+        import homework
+
+        def broken_body():
+            yield b'{"homeworks": [{"id": 1'
+            raise requests.exceptions.ChunkedEncodingError('обрыв')
+
+        circuit = CircuitBreaker(
+            'practicum', failure_threshold=2,
+            is_failure=homework.is_api_outage)
+        monkeypatch.setattr(homework, 'api_breaker', circuit)
+        monkeypatch.setattr(homework, 'STREAMING', True)
+        monkeypatch.setattr(
+            homework, 'request_answer',
+            lambda token, current_timestamp: StreamedAnswer(broken_body()))
+        queue = DeliveryQueue(None, RateLimiter(1000, 0))
+        subscription = Subscription('token', 1)
+        for _ in range(2):
+            homework.poll_group(queue, [subscription])
+        assert circuit.state == OPEN, (
+            'Обрыв тела ответа должен считаться сбоем API'
+        )
+
+
+class TestStreamCache:
+
+    def test_not_modified(self):
+        cache = ResponseCache()
+        first = FakeResponse(
+            split(json.dumps(ANSWER), 64), headers={'ETag': '"v1"'})
+        answer = cache.stream('token', 0, first)
+        assert cache.conditional_headers('token', 0) == {}, (
+            'Непрочитанный до конца ответ не должен использоваться кэшем'
+        )
+        list(answer.records())
+        assert first.closed
+        assert cache.conditional_headers('token', 0) == {
+            'If-None-Match': '"v1"'}
+        not_modified = FakeResponse([], HTTPStatus.NOT_MODIFIED)
+        assert cache.stream('token', 0, not_modified) is answer
+        assert not_modified.closed
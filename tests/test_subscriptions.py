@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+
+class TestSubscriptions:
+
+    def test_load_from_env(self):
+        import subscriptions
+
+        result = subscriptions.load_subscriptions(None, 'sometoken', 12345)
+        assert len(result) == 1, (
+            'Без реестра подписок должна создаваться одна подписка '
+            'из переменных окружения'
+        )
+        assert result[0].token == 'sometoken'
+        assert result[0].chat_id == 12345
+        assert result[0].timestamp == 0
+
+    def test_load_from_file(self, tmp_path):
+        import subscriptions
+
+        path = tmp_path / 'subscriptions.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'first', 'chat_id': 1},
+            {'practicum_token': 'second', 'chat_id': 2, 'from_date': 100},
+        ]))
+        result = subscriptions.load_subscriptions(str(path))
+        assert [item.chat_id for item in result] == [1, 2], (
+            'Проверьте, что загружаются все подписки из реестра'
+        )
+        assert result[1].timestamp == 100, (
+            'Проверьте, что для подписки учитывается `from_date`'
+        )
+
+    def test_load_broken_file(self, tmp_path):
+        import exceptions
+        import subscriptions
+
+        path = tmp_path / 'subscriptions.json'
+        path.write_text(json.dumps([{'chat_id': 1}]))
+        with pytest.raises(exceptions.WrongSubscriptionError):
+            subscriptions.load_subscriptions(str(path))
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+import exceptions
+from subscriptions import load_subscriptions
+from templates import MessageTemplates, TemplateCatalog
+
+
+class TestTemplates:
+
+    def test_render_matches_format(self):
+        import homework
+
+        for status, verdict in homework.VERDICTS.items():
+            assert homework.format_status('hw', status) == (
+                f'Изменился статус проверки работы "hw". {verdict}'
+            )
+
+    def test_lru_bounded(self):
+        templates = MessageTemplates(
+            '{homework_name}: {verdict}', {'approved': 'ok'}, cache_size=2)
+        for name in ('a', 'b', 'a', 'c'):
+            assert templates.render(name, 'approved') == f'{name}: ok'
+        info = templates.render.cache_info()
+        assert info.hits == 1 and info.currsize == 2, (
+            'Сообщения должны кэшироваться в LRU ограниченного размера'
+        )
+
+    def test_bad_template(self):
+        with pytest.raises(ValueError):
+            MessageTemplates('{verdict}', {'approved': 'ok'})
+        with pytest.raises(ValueError):
+            MessageTemplates('{homework_name} {lesson}', {'approved': 'ok'})
+
+    def test_tenant_templates(self, tmp_path):
+        catalog = TemplateCatalog(
+            '"{homework_name}". {verdict}', {'approved': 'Принята'})
+        path = tmp_path / 'subscriptions.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'a', 'chat_id': 1},
+            {'practicum_token': 'b', 'chat_id': 2, 'locale': 'en'},
+            {'practicum_token': 'c', 'chat_id': 3, 'locale': 'en'},
+            {'practicum_token': 'd', 'chat_id': 4,
+             'templates': {'approved': 'Зачёт'}},
+        ]))
+        default, english, other, custom = load_subscriptions(
+            str(path), catalog=catalog)
+        assert default.templates is None
+        assert english.templates is other.templates, (
+            'Подписки с одинаковыми настройками должны делить шаблоны'
+        )
+        assert english.templates.render('hw', 'approved').startswith(
+            'Homework "hw"')
+        assert custom.templates.render('hw', 'approved') == '"hw". Зачёт'
+
+        path.write_text(json.dumps([
+            {'practicum_token': 'a', 'chat_id': 1, 'locale': 'xx'}]))
+        with pytest.raises(exceptions.WrongSubscriptionError):
+            load_subscriptions(str(path), catalog=catalog)
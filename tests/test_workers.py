@@ -0,0 +1,105 @@
+from storage import JSONStateStore
+from subscriptions import Subscription
+from workers import HashRing, Shard
+
+
+class TestWorkers:
+
+    def test_ring_moves_only_dead_worker_keys(self):
+        keys = [f'key{number}' for number in range(1000)]
+        before = HashRing([0, 1, 2, 3])
+        after = HashRing([0, 1, 3])
+        owners = {key: before.node_for(key) for key in keys}
+        assert set(owners.values()) == {0, 1, 2, 3}
+        for key in keys:
+            if owners[key] != 2:
+                assert after.node_for(key) == owners[key], (
+                    'При уходе воркера должны переезжать только его ключи'
+                )
+            else:
+                assert after.node_for(key) in (0, 1, 3)
+
+    def test_shard_takes_over_state(self, tmp_path):
+        path = str(tmp_path / 'state.json')
+        subscriptions = [
+            [Subscription(f'token{number}', number) for number in range(20)]
+            for _ in range(2)
+        ]
+        shards = [
+            Shard(worker_id, subscriptions[worker_id], JSONStateStore(path))
+            for worker_id in range(2)
+        ]
+        first = shards[0].assign([0, 1])
+        second = shards[1].assign([0, 1])
+        assert first and second
+        assert len(first) + len(second) == 20
+        for subscription in first:
+            subscription.timestamp = 100
+            subscription.statuses['1'] = 'approved'
+            shards[0].store.save(subscription)
+        shards[0].store.flush()
+        for subscription in second:
+            subscription.timestamp = 200
+
+        taken = shards[1].assign([1])
+        assert len(taken) == 20
+        by_key = {subscription.key: subscription for subscription in taken}
+        for subscription in first:
+            moved = by_key[subscription.key]
+            assert moved.timestamp == 100, (
+                'Подписка упавшего воркера должна продолжить с его метки'
+            )
+            assert moved.statuses == {'1': 'approved'}
+        for subscription in second:
+            restarted = Subscription(subscription.token, subscription.chat_id)
+            JSONStateStore(path).load(restarted)
+            assert restarted.timestamp == 200, (
+                'Отданные и полученные подписки должны сохраняться в общий '
+                'файл состояния'
+            )
+
+    def test_json_store_merges_writers(self, tmp_path):
+        path = str(tmp_path / 'state.json')
+        stores = [JSONStateStore(path), JSONStateStore(path)]
+        for number, store in enumerate(stores):
+            subscription = Subscription('token', number)
+            subscription.timestamp = 100 + number
+            store.save(subscription)
+            store.flush()
+        for number in range(2):
+            subscription = Subscription('token', number)
+            JSONStateStore(path).load(subscription)
+            assert subscription.timestamp == 100 + number, (
+                'Запись одного процесса не должна затирать записи другого'
+            )
+
+    def test_worker_prepare_shares_rate(self, monkeypatch, tmp_path):
+        import homework
+        from storage import StateStore
+
+        class RecordingStore(StateStore):
+
+            def __init__(self):
+                self.loaded = []
+
+            def load(self, subscription):
+                self.loaded.append(subscription.key)
+
+        store = RecordingStore()
+        monkeypatch.setattr(homework, 'make_store', lambda path: store)
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'token')
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '1')
+        monkeypatch.setattr(homework, 'SUBSCRIPTIONS_FILE', None)
+        monkeypatch.setattr(homework, 'TELEGRAM_RATE', 30)
+
+        queue, subscriptions, _ = homework.prepare(3)
+        assert queue.limiter.global_interval == 1 / 10, (
+            'Воркеры должны делить лимит сообщений бота между собой'
+        )
+        assert subscriptions and not store.loaded, (
+            'Воркер загружает состояние только для своей доли подписок'
+        )
+        shard = Shard(0, subscriptions, store)
+        shard.assign([0])
+        assert store.loaded == [item.key for item in subscriptions]
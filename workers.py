@@ -0,0 +1,201 @@
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import time
+
+from lifecycle import WAKEUP_INTERVAL, Lifecycle
+
+logger = logging.getLogger(__name__)
+
+REPLICAS = 100
+
+
+def ring_hash(value):
+    """Возвращает позицию значения на кольце хэшей."""
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HashRing:
+    """Кольцо согласованного хэширования.
+    При уходе или добавлении воркера переезжают только ключи, попадавшие
+    на его точки кольца, остальные остаются на своих воркерах.
+    """
+
+    def __init__(self, nodes, replicas=REPLICAS):
+        """Размещает каждый узел nodes в replicas точках кольца."""
+        points = sorted(
+            (ring_hash(f'{node}-{replica}'), node)
+            for node in nodes for replica in range(replicas)
+        )
+        self.hashes = [point for point, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        """Возвращает узел, отвечающий за ключ key."""
+        if not self.nodes:
+            return None
+        position = bisect.bisect(self.hashes, ring_hash(key))
+        return self.nodes[position % len(self.nodes)]
+
+
+class Shard:
+    """Доля подписок одного воркера."""
+
+    def __init__(self, worker_id, subscriptions, store, scheduler=None):
+        """Запоминает все подписки и хранилище их состояния.
+        С планировщиком scheduler полученные подписки опрашиваются в
+        своих слотах, без него - сразу.
+        """
+        self.worker_id = worker_id
+        self.subscriptions = subscriptions
+        self.store = store
+        self.scheduler = scheduler
+        self.active = []
+
+    def assign(self, members):
+        """Пересчитывает долю по списку живых воркеров members.
+        Подписки распределяются по токену, чтобы подписки с общим токеном
+        попали к одному воркеру и делили запрос к API. Отданные подписки
+        сохраняются, полученные - загружаются из хранилища, куда их
+        последнее состояние записал прежний воркер.
+        """
+        ring = HashRing(members)
+        active = [
+            subscription for subscription in self.subscriptions
+            if ring.node_for(subscription.token) == self.worker_id
+        ]
+        keys = {subscription.key for subscription in self.active}
+        for subscription in self.active:
+            self.store.save(subscription)
+        self.store.flush()
+        self.store.refresh()
+        acquired = [
+            subscription for subscription in active
+            if subscription.key not in keys
+        ]
+        for subscription in acquired:
+            self.store.load(subscription)
+            subscription.next_poll = 0
+        if self.scheduler is not None:
+            self.scheduler.spread(acquired)
+        logger.info(
+            f'Воркер {self.worker_id}: подписок {len(active)} '
+            f'из {len(self.subscriptions)}, воркеров {len(members)}'
+        )
+        self.active = active
+        return active
+
+
+class Supervisor:
+    """Запускает воркеры в отдельных процессах и следит за ними.
+    Каждому воркеру по каналу отправляется список живых воркеров; по нему
+    воркер сам выбирает свои подписки. Упавший воркер исключается из
+    списка сразу и перезапускается через restart_delay секунд. SIGHUP из
+    lifecycle пересылается воркерам, остановка останавливает и их.
+    """
+
+    def __init__(self, count, target, restart_delay=5, lifecycle=None):
+        """Готовит count воркеров, исполняющих target(worker_id, канал)."""
+        self.count = count
+        self.target = target
+        self.restart_delay = restart_delay
+        self.lifecycle = lifecycle or Lifecycle()
+        self.workers = {}
+        self.restarts = {}
+
+    def spawn(self, worker_id):
+        """Запускает воркер worker_id."""
+        connection, child_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=self.target, args=(worker_id, child_connection),
+            name=f'worker-{worker_id}', daemon=True,
+        )
+        process.start()
+        child_connection.close()
+        self.workers[worker_id] = (process, connection)
+        logger.info(f'Запущен воркер {worker_id}, pid {process.pid}')
+
+    def broadcast(self):
+        """Рассылает живым воркерам актуальный список воркеров."""
+        members = sorted(self.workers)
+        for worker_id, (_, connection) in list(self.workers.items()):
+            try:
+                connection.send(members)
+            except OSError:
+                pass
+
+    def forward_reload(self):
+        """Пересылает воркерам запрос перезагрузки настроек."""
+        logger.info('Перезагрузка настроек воркеров')
+        for process, _ in self.workers.values():
+            try:
+                os.kill(process.pid, signal.SIGHUP)
+            except OSError:
+                pass
+
+    def reap(self):
+        """Убирает завершившиеся воркеры и планирует их перезапуск."""
+        for worker_id, (process, connection) in list(self.workers.items()):
+            if process.is_alive():
+                continue
+            logger.error(
+                f'Воркер {worker_id} завершился с кодом {process.exitcode}')
+            connection.close()
+            del self.workers[worker_id]
+            self.restarts[worker_id] = time.monotonic() + self.restart_delay
+
+    def run(self):
+        """Запускает воркеры и перераспределяет подписки при их падении."""
+        for worker_id in range(self.count):
+            self.spawn(worker_id)
+        self.broadcast()
+        try:
+            while not self.lifecycle.is_set():
+                if self.lifecycle.take_reload():
+                    self.forward_reload()
+                timeout = WAKEUP_INTERVAL
+                if self.restarts:
+                    timeout = min(max(
+                        min(self.restarts.values()) - time.monotonic(), 0),
+                        timeout)
+                multiprocessing.connection.wait(
+                    [process.sentinel for process, _ in self.workers.values()],
+                    timeout,
+                )
+                if self.lifecycle.is_set():
+                    break
+                alive = len(self.workers)
+                self.reap()
+                changed = len(self.workers) != alive
+                now = time.monotonic()
+                for worker_id, deadline in list(self.restarts.items()):
+                    if deadline <= now:
+                        del self.restarts[worker_id]
+                        self.spawn(worker_id)
+                        changed = True
+                if changed:
+                    self.broadcast()
+        finally:
+            self.stop()
+
+    def stop(self, timeout=25):
+        """Просит воркеры завершиться и добивает не успевшие.
+        timeout укладывается в 30 секунд, которые платформа даёт на
+        остановку, и оставляет воркерам время сохранить состояние.
+        """
+        for process, connection in self.workers.values():
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+        deadline = time.monotonic() + timeout
+        for process, _ in self.workers.values():
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                process.terminate()
+        self.workers.clear()